@@ -0,0 +1,70 @@
+"""Concurrency limiting with load shedding for search workers."""
+import time
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from typing import Any, Dict
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted and should be shed (HTTP 429)."""
+
+class SearchBudgetExceeded(Exception):
+    """Raised when a search runs past its compute/time budget."""
+
+class AdmissionController:
+    """Admit at most max_concurrent searches; queue up to max_queue more for queue_timeout seconds."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = BoundedSemaphore(max_concurrent)
+        self._lock = Lock()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+
+    @contextmanager
+    def slot(self):
+        """Hold one search slot for the duration of the block, or raise Overloaded."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    self.shed += 1
+                    raise Overloaded('Search queue is full')
+                self.waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.shed += 1
+                raise Overloaded('Timed out waiting for a search slot')
+        with self._lock:
+            self.active += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'shed': self.shed
+        }
+
+def deadline_after(seconds: float) -> float:
+    """Monotonic deadline for a budget of seconds (0 or less means no budget)."""
+    return time.monotonic() + seconds if seconds > 0 else float('inf')
+
+def check_deadline(deadline: float) -> None:
+    """Abort the current search when its budget has run out."""
+    if time.monotonic() > deadline:
+        raise SearchBudgetExceeded('Search exceeded its time budget')
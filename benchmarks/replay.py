@@ -0,0 +1,219 @@
+"""Replay recorded /api/search payloads against the app.
+
+Each line of the input JSONL file is either a search payload or an object
+with the payload under "payload" (other keys such as timestamps are ignored).
+
+Usage:
+    # In-process through the Flask test client, against synthetic inventory
+    python -m benchmarks.replay traffic.jsonl --synthetic --concurrency 8
+
+    # Over HTTP against a running server, capped at 50 requests/s
+    python -m benchmarks.replay traffic.jsonl --url http://localhost:5000 --rate 50
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.run import percentile
+
+SEARCH_PATH = '/api/search'
+
+def load_payloads(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Read search payloads from a JSONL file."""
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            payloads.append(record['payload'] if isinstance(record.get('payload'), dict) else record)
+            if limit and len(payloads) >= limit:
+                break
+    return payloads
+
+class InProcessTarget:
+    """Send requests through the Flask test client, one client per thread."""
+
+    def __init__(self):
+        from search_api import app
+        self.app = app
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def send(self, payload: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        response = self._client().post(SEARCH_PATH, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        import metrics
+        return metrics.cache_stats()
+
+class HttpTarget:
+    """Send requests to a running server."""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, payload: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        request = urllib.request.Request(
+            self.url + SEARCH_PATH,
+            data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Scrape cache counters from the server's /metrics endpoint."""
+        try:
+            with urllib.request.urlopen(self.url + '/metrics', timeout=self.timeout) as response:
+                body = response.read().decode()
+        except (urllib.error.URLError, OSError):
+            return {}
+        stats = {}
+        pattern = re.compile(r'^search_cache_(hits_total|misses_total|entries)\{cache="([^"]+)"\} (\S+)$')
+        keys = {'hits_total': 'hits', 'misses_total': 'misses', 'entries': 'size'}
+        for line in body.splitlines():
+            match = pattern.match(line)
+            if match:
+                stats.setdefault(match.group(2), {})[keys[match.group(1)]] = float(match.group(3))
+        return stats
+
+def cache_deltas(before: Dict[str, Dict[str, Any]], after: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Hits, misses and hit ratio of each cache over the replay."""
+    deltas = {}
+    for name, values in after.items():
+        hits = values.get('hits', 0) - before.get(name, {}).get('hits', 0)
+        misses = values.get('misses', 0) - before.get(name, {}).get('misses', 0)
+        total = hits + misses
+        deltas[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0
+        }
+    return deltas
+
+def replay(target, payloads: List[Dict[str, Any]], concurrency: int = 1,
+           rate: Optional[float] = None) -> Dict[str, Any]:
+    """Drive payloads against target and summarize latency, errors and cache hits."""
+    latencies = []
+    statuses = {}
+    errors = 0
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def send(index: int, payload: Dict[str, Any]) -> None:
+        nonlocal errors
+        # Open-loop pacing: request i is due at i / rate seconds after start
+        if rate:
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        start = time.perf_counter()
+        try:
+            status, body = target.send(payload)
+        except Exception:
+            status, body = 'exception', None
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 'exception' or not 200 <= status < 300 or (body or {}).get('error'):
+                errors += 1
+
+    before = target.cache_stats()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index, payload in enumerate(payloads):
+                pool.submit(send, index, payload)
+    duration = time.perf_counter() - started
+    after = target.cache_stats()
+
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'rate': rate,
+        'duration_s': duration,
+        'throughput_per_s': len(latencies) / duration if duration else 0.0,
+        'error_rate': errors / len(latencies) if latencies else 0.0,
+        'statuses': statuses,
+        'latency_ms': {
+            'p50': percentile(latencies, 50) * 1000,
+            'p90': percentile(latencies, 90) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000
+        } if latencies else {},
+        'caches': cache_deltas(before, after)
+    }
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    print(f"Requests:    {summary['requests']} in {summary['duration_s']:.2f}s "
+          f"({summary['throughput_per_s']:.1f}/s, concurrency {summary['concurrency']})")
+    print(f"Error rate:  {summary['error_rate'] * 100:.2f}%  statuses {summary['statuses']}")
+    if summary['latency_ms']:
+        latency = summary['latency_ms']
+        print(f"Latency ms:  p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  "
+              f"p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+    for name, stats in summary['caches'].items():
+        print(f"Cache {name}: {stats['hits']:.0f} hits / {stats['misses']:.0f} misses "
+              f"({stats['hit_ratio'] * 100:.1f}% hit ratio)")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Replay recorded /api/search payloads.')
+    parser.add_argument('path', help='JSONL file of recorded search payloads')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--rate', type=float, help='target requests per second (default: as fast as possible)')
+    parser.add_argument('--limit', type=int, help='replay at most this many payloads')
+    parser.add_argument('--repeat', type=int, default=1, help='replay the file this many times')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='in-process only: serve from seeded synthetic inventory instead of the database')
+    parser.add_argument('--cities', type=int, default=2)
+    parser.add_argument('--hotels', type=int, default=20)
+    parser.add_argument('--rooms', type=int, default=4)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--start', default='2025-01-01')
+    parser.add_argument('--output', help='write the summary as JSON to this path')
+    args = parser.parse_args(argv)
+
+    payloads = load_payloads(args.path, args.limit) * args.repeat
+
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        logging.disable(logging.CRITICAL)
+        if args.synthetic:
+            import db_config
+            from benchmarks.synthetic import create_sqlite_engine, load_sqlite
+            engine = create_sqlite_engine()
+            load_sqlite(engine, args.cities, args.hotels, args.rooms, args.days, args.start)
+            db_config.configure(engine=engine)
+        target = InProcessTarget()
+
+    summary = replay(target, payloads, args.concurrency, args.rate)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == '__main__':
+    main()
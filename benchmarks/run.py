@@ -0,0 +1,187 @@
+"""Benchmark the search pipeline against seeded synthetic inventory.
+
+Usage:
+    python -m benchmarks.run --cities 2 --hotels 20 --rooms 4 --days 60
+
+Each run is stored as JSON under benchmarks/results/ and compared with the
+previous run (or --compare PATH) so regressions show up as deltas.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import logging
+import math
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import db_config
+import functions
+from benchmarks.synthetic import create_sqlite_engine, generate_hotels, load_sqlite
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 1,
+            setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Time fn and report throughput, latency percentiles and peak memory."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(warmup):
+            if setup:
+                setup()
+            fn()
+
+        latencies = []
+        for _ in range(iterations):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+
+        # Peak memory is measured on a separate call so tracing does not skew timings
+        if setup:
+            setup()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'throughput_per_s': iterations / total if total else 0.0,
+        'mean_ms': total / iterations * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_memory_kb': peak / 1024
+    }
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """Build the synthetic inventory and time every pipeline stage."""
+    engine = create_sqlite_engine()
+    row_counts = load_sqlite(engine, args.cities, args.hotels, args.rooms, args.days, args.start, args.seed)
+    db_config.configure(engine=engine)
+
+    check_in = (datetime.strptime(args.start, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    check_out = (datetime.strptime(check_in, '%Y-%m-%d') + timedelta(days=args.nights)).strftime('%Y-%m-%d')
+    hotels = generate_hotels(args.cities, args.hotels, args.rooms, args.days, args.start, args.seed, city_id=1)
+    room = next(r for r in hotels[0]['rooms'] if r['max_adults'] >= 3)
+    adults, children_ages, num_rooms = 3, [4, 9], 2
+    payload = {
+        'city_id': '1',
+        'checkIn': check_in,
+        'checkOut': check_out,
+        'adults': adults,
+        'rooms': num_rooms,
+        'children': len(children_ages),
+        'childrenAges': children_ages
+    }
+
+    from search_api import app
+    client = app.test_client()
+
+    setup = functions.clear_price_caches if args.cold else None
+    stages = {
+        'split_party': lambda: functions.split_party(8, 4, 3, 2, 2),
+        'allocate_rooms_and_calculate_price': lambda: functions.allocate_rooms_and_calculate_price(
+            room, adults, children_ages, check_in, check_out, num_rooms, 'Room with Breakfast'),
+        'search_hotels': lambda: functions.search_hotels(
+            hotels, '1', '', '', adults, children_ages, check_in, check_out, num_rooms),
+        'get_hotels_structured': lambda: functions.get_hotels_structured('1', '', '', check_in, check_out),
+        'api_search': lambda: client.post('/api/search', json=payload),
+    }
+
+    results = {}
+    for name, fn in stages.items():
+        if args.only and name not in args.only:
+            continue
+        iterations = args.iterations if name != 'split_party' else args.iterations * 10
+        results[name] = measure(fn, iterations, setup=setup)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'cities': args.cities,
+            'hotels': args.hotels,
+            'rooms': args.rooms,
+            'days': args.days,
+            'nights': args.nights,
+            'seed': args.seed,
+            'iterations': args.iterations,
+            'cold': args.cold
+        },
+        'row_counts': row_counts,
+        'results': results
+    }
+
+def latest_result(exclude: Optional[str] = None) -> Optional[str]:
+    """Path of the most recent stored result file."""
+    paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if p != exclude)
+    return paths[-1] if paths else None
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Print a table of results with deltas against a baseline run."""
+    print(f"{'stage':<38}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak KB':>11}{'p50 delta':>12}")
+    for name, stats in report['results'].items():
+        delta = ''
+        if baseline and name in baseline.get('results', {}):
+            previous = baseline['results'][name]['p50_ms']
+            if previous:
+                delta = f"{(stats['p50_ms'] - previous) / previous * 100:+.1f}%"
+        print(f"{name:<38}{stats['throughput_per_s']:>12.1f}{stats['p50_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['peak_memory_kb']:>11.1f}{delta:>12}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the hotel search pipeline.')
+    parser.add_argument('--cities', type=int, default=2)
+    parser.add_argument('--hotels', type=int, default=20, help='hotels per city')
+    parser.add_argument('--rooms', type=int, default=4, help='rooms per hotel')
+    parser.add_argument('--days', type=int, default=60, help='days of rates per room')
+    parser.add_argument('--nights', type=int, default=3, help='length of the searched stay')
+    parser.add_argument('--start', default='2025-01-01')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--cold', action='store_true', help='clear pricing caches before every call')
+    parser.add_argument('--only', nargs='*', help='stages to run')
+    parser.add_argument('--compare', help='result file to compare against (default: previous run)')
+    parser.add_argument('--no-save', action='store_true', help='do not store this run')
+    args = parser.parse_args(argv)
+
+    # Debug logging would dominate the timings
+    logging.disable(logging.CRITICAL)
+
+    report = run_benchmarks(args)
+
+    output = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baseline_path = args.compare or latest_result(exclude=output)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    print_report(report, baseline)
+    if output:
+        print(f"\nSaved results to {output}")
+    if baseline_path:
+        print(f"Compared with {baseline_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Seeded synthetic inventory for benchmarking the search pipeline.
+
+Generates N cities x M hotels x R rooms x D days x 4 meal plans either as
+get_hotels_structured-shaped structures or as rows loaded into a local
+SQLite stand-in of the anh_* tables.
+"""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from functions import MEAL_PLAN_MAP
+
+SCHEMA = [
+    """CREATE TABLE anh_master_city (
+        id INTEGER PRIMARY KEY, city TEXT)""",
+    """CREATE TABLE anh_master_hotel_category (
+        id INTEGER PRIMARY KEY, hotel_type TEXT)""",
+    """CREATE TABLE anh_master_brands_group (
+        id INTEGER PRIMARY KEY, brand_group TEXT)""",
+    """CREATE TABLE anh_hotels (
+        id INTEGER PRIMARY KEY, hotel_name TEXT, description TEXT, city_id INTEGER,
+        featured_photo TEXT, hotel_type_id INTEGER, star_category INTEGER, address TEXT,
+        brand_id INTEGER, is_active INTEGER, is_delete INTEGER)""",
+    """CREATE TABLE anh_distributor_hotels_list (
+        id INTEGER PRIMARY KEY, hotel_id INTEGER, city_id INTEGER, distributor_id INTEGER,
+        is_active INTEGER, is_delete INTEGER)""",
+    """CREATE TABLE anh_hotel_rooms (
+        id INTEGER PRIMARY KEY, hotel_id INTEGER, room_name TEXT, room_type TEXT,
+        room_view TEXT, room_size TEXT, extra_bed TEXT, max_adults INTEGER,
+        max_children INTEGER, max_occupancy INTEGER, free_child_age_limit INTEGER,
+        featured_photo TEXT, is_active INTEGER, is_delete INTEGER)""",
+    """CREATE TABLE anh_distributor_rooms_list (
+        id INTEGER PRIMARY KEY, dist_hotel_id INTEGER, room_id INTEGER)""",
+    """CREATE TABLE anh_room_pricing (
+        id INTEGER PRIMARY KEY, dist_hotel_id INTEGER, dist_room_id INTEGER, date DATE,
+        meal_plan_id INTEGER, price_adult_1 INTEGER, price_adult_2 INTEGER,
+        extra_adult INTEGER, extra_child INTEGER)""",
+    "CREATE INDEX ix_pricing_room_date ON anh_room_pricing (dist_room_id, date)",
+    """CREATE TABLE anh_room_inventory (
+        id INTEGER PRIMARY KEY, dist_hotel_id INTEGER, dist_room_id INTEGER, date DATE,
+        available_rooms INTEGER)""",
+    "CREATE INDEX ix_inventory_room_date ON anh_room_inventory (dist_room_id, date)",
+]
+
+ROOM_TYPES = [
+    ('Standard', 2, 1, 3),
+    ('Deluxe', 2, 2, 3),
+    ('Suite', 3, 2, 4),
+    ('Family', 4, 3, 6),
+]
+
+def generate_tables(cities: int = 2, hotels: int = 10, rooms: int = 4, days: int = 30,
+                    start: str = '2025-01-01', seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """Generate rows for every anh_* table used by get_hotels_structured."""
+    rng = random.Random(seed)
+    start_date = datetime.strptime(start, '%Y-%m-%d').date()
+    tables = {
+        'anh_master_city': [],
+        'anh_master_hotel_category': [{'id': 1, 'hotel_type': 'Hotel'}, {'id': 2, 'hotel_type': 'Resort'}],
+        'anh_master_brands_group': [{'id': 1, 'brand_group': 'Brand A'}, {'id': 2, 'brand_group': 'Brand B'}],
+        'anh_hotels': [],
+        'anh_distributor_hotels_list': [],
+        'anh_hotel_rooms': [],
+        'anh_distributor_rooms_list': [],
+        'anh_room_pricing': [],
+        'anh_room_inventory': [],
+    }
+    hotel_id = room_id = price_id = inventory_id = 0
+    for city_id in range(1, cities + 1):
+        tables['anh_master_city'].append({'id': city_id, 'city': f'City {city_id}'})
+        for _ in range(hotels):
+            hotel_id += 1
+            tables['anh_hotels'].append({
+                'id': hotel_id,
+                'hotel_name': f'Hotel {hotel_id:05d}',
+                'description': f'Synthetic hotel {hotel_id}',
+                'city_id': city_id,
+                'featured_photo': f'hotel_{hotel_id}.jpg',
+                'hotel_type_id': rng.randint(1, 2),
+                'star_category': rng.randint(2, 5),
+                'address': f'{hotel_id} Main Road',
+                'brand_id': rng.randint(1, 2),
+                'is_active': 1,
+                'is_delete': 0
+            })
+            # dist_hotel_id mirrors hotel_id for a single distributor
+            tables['anh_distributor_hotels_list'].append({
+                'id': hotel_id, 'hotel_id': hotel_id, 'city_id': city_id,
+                'distributor_id': 1, 'is_active': 1, 'is_delete': 0
+            })
+            for r in range(rooms):
+                room_id += 1
+                room_type, max_adults, max_children, max_occupancy = ROOM_TYPES[r % len(ROOM_TYPES)]
+                tables['anh_hotel_rooms'].append({
+                    'id': room_id,
+                    'hotel_id': hotel_id,
+                    'room_name': f'{room_type} {r + 1}',
+                    'room_type': room_type,
+                    'room_view': 'City',
+                    'room_size': '300 sq ft',
+                    'extra_bed': 'Yes',
+                    'max_adults': max_adults,
+                    'max_children': max_children,
+                    'max_occupancy': max_occupancy,
+                    'free_child_age_limit': 5,
+                    'featured_photo': f'room_{room_id}.jpg',
+                    'is_active': 1,
+                    'is_delete': 0
+                })
+                tables['anh_distributor_rooms_list'].append({
+                    'id': room_id, 'dist_hotel_id': hotel_id, 'room_id': room_id
+                })
+                base = rng.randint(20, 80) * 100
+                for d in range(days):
+                    night = start_date + timedelta(days=d)
+                    # Roughly 1 in 10 nights has no inventory row (unlimited), 1 in 10 is sold out
+                    if rng.random() >= 0.1:
+                        inventory_id += 1
+                        tables['anh_room_inventory'].append({
+                            'id': inventory_id,
+                            'dist_hotel_id': hotel_id,
+                            'dist_room_id': room_id,
+                            'date': night,
+                            'available_rooms': 0 if rng.random() < 0.1 else rng.randint(1, 10)
+                        })
+                    for meal_plan_id in MEAL_PLAN_MAP:
+                        price_id += 1
+                        price_adult_1 = base + (meal_plan_id - 1) * 500 + rng.randint(0, 10) * 50
+                        tables['anh_room_pricing'].append({
+                            'id': price_id,
+                            'dist_hotel_id': hotel_id,
+                            'dist_room_id': room_id,
+                            'date': night,
+                            'meal_plan_id': meal_plan_id,
+                            'price_adult_1': price_adult_1,
+                            'price_adult_2': price_adult_1 + 1000,
+                            'extra_adult': 800 + meal_plan_id * 100,
+                            'extra_child': 400 + meal_plan_id * 50
+                        })
+    return tables
+
+def generate_hotels(cities: int = 2, hotels: int = 10, rooms: int = 4, days: int = 30,
+                    start: str = '2025-01-01', seed: int = 0,
+                    city_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Generate hotels shaped like the get_hotels_structured output."""
+    tables = generate_tables(cities, hotels, rooms, days, start, seed)
+    city_names = {c['id']: c['city'] for c in tables['anh_master_city']}
+    hotel_types = {t['id']: t['hotel_type'] for t in tables['anh_master_hotel_category']}
+    brands = {b['id']: b['brand_group'] for b in tables['anh_master_brands_group']}
+
+    structured = {}
+    for h in tables['anh_hotels']:
+        if city_id and h['city_id'] != city_id:
+            continue
+        structured[h['id']] = {
+            'hotel_id': h['id'],
+            'dist_hotel_id': h['id'],
+            'hotel_name': h['hotel_name'],
+            'description': h['description'],
+            'city_id': h['city_id'],
+            'city_name': city_names[h['city_id']],
+            'featured_photo': h['featured_photo'],
+            'hotel_type': hotel_types[h['hotel_type_id']],
+            'star_category': h['star_category'],
+            'address': h['address'],
+            'brand_name': brands[h['brand_id']],
+            'brand_id': h['brand_id'],
+            'rooms': {}
+        }
+    for r in tables['anh_hotel_rooms']:
+        if r['hotel_id'] not in structured:
+            continue
+        structured[r['hotel_id']]['rooms'][r['id']] = {
+            'room_id': r['id'],
+            'dist_room_id': r['id'],
+            'room_name': r['room_name'],
+            'room_type': r['room_type'],
+            'room_view': r['room_view'],
+            'room_size': r['room_size'],
+            'extra_bed': r['extra_bed'],
+            'max_adults': r['max_adults'],
+            'max_children': r['max_children'],
+            'max_occupancy': r['max_occupancy'],
+            'free_child_age': r['free_child_age_limit'],
+            'featured_photo': r['featured_photo'],
+            'pricing': {},
+            'availability': {}
+        }
+    for p in tables['anh_room_pricing']:
+        if p['dist_hotel_id'] not in structured:
+            continue
+        meal_plan = MEAL_PLAN_MAP[p['meal_plan_id']]
+        pricing = structured[p['dist_hotel_id']]['rooms'][p['dist_room_id']]['pricing']
+        date_pricing = pricing.setdefault(p['date'], {'1A': {}, '2A': {}, 'EA': {}, 'EC': {}})
+        date_pricing['1A'][meal_plan] = p['price_adult_1']
+        date_pricing['2A'][meal_plan] = p['price_adult_2']
+        date_pricing['EA'][meal_plan] = p['extra_adult']
+        date_pricing['EC'][meal_plan] = p['extra_child']
+    for i in tables['anh_room_inventory']:
+        if i['dist_hotel_id'] in structured:
+            structured[i['dist_hotel_id']]['rooms'][i['dist_room_id']]['availability'][i['date']] = i['available_rooms']
+
+    for hotel in structured.values():
+        hotel['rooms'] = list(hotel['rooms'].values())
+    return list(structured.values())
+
+def create_sqlite_engine(path: str = ':memory:'):
+    """Create a SQLite engine that returns DATE columns as date objects like MySQL does."""
+    return create_engine(
+        f'sqlite:///{path}',
+        connect_args={'detect_types': sqlite3.PARSE_DECLTYPES, 'check_same_thread': False},
+        # A single shared connection keeps an in-memory database alive across sessions
+        poolclass=StaticPool
+    )
+
+def load_sqlite(engine, cities: int = 2, hotels: int = 10, rooms: int = 4, days: int = 30,
+                start: str = '2025-01-01', seed: int = 0) -> Dict[str, int]:
+    """Create the anh_* tables on engine and fill them with synthetic rows."""
+    tables = generate_tables(cities, hotels, rooms, days, start, seed)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        for table, rows in tables.items():
+            if not rows:
+                continue
+            columns = list(rows[0].keys())
+            conn.execute(
+                text(f"INSERT INTO {table} ({', '.join(columns)}) "
+                     f"VALUES ({', '.join(':' + c for c in columns)})"),
+                rows
+            )
+    return {table: len(rows) for table, rows in tables.items()}
@@ -0,0 +1,33 @@
+"""Shared fixtures: a synthetic SQLite inventory and apps built on it."""
+import logging
+
+import pytest
+
+import db_config
+import functions
+from benchmarks.synthetic import create_sqlite_engine, load_sqlite
+
+# The app logs every request at DEBUG; keep test output readable
+logging.disable(logging.DEBUG)
+
+SEARCH = {'city_id': '1', 'checkIn': '2025-01-02', 'checkOut': '2025-01-04', 'adults': 2}
+
+@pytest.fixture(scope='session')
+def synthetic_engine():
+    engine = create_sqlite_engine()
+    load_sqlite(engine, cities=1, hotels=3, rooms=3, days=30, start='2025-01-01')
+    return engine
+
+@pytest.fixture
+def synthetic_db(synthetic_engine):
+    """Point db_config at the synthetic inventory with cold caches."""
+    db_config.configure(engine=synthetic_engine)
+    functions.invalidate_inventory_cache()
+    yield synthetic_engine
+    functions.invalidate_inventory_cache()
+
+@pytest.fixture
+def make_app(synthetic_db):
+    """Build a search app on the synthetic inventory with config overrides."""
+    from search_api import create_app
+    return lambda **config: create_app(config)
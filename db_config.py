@@ -1,29 +1,91 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+import os
+from threading import Lock
+from urllib.parse import quote_plus
 
-# Database configuration
-DB_HOST = 'ls-c58472822a3bb4a898de3fa2ff20dad9426ac9ab.c5g08c00ahp4.ap-south-1.rds.amazonaws.com'
-DB_USERNAME = 'dbmasteruser'
-DB_PASSWORD = 'sLpLxurfv!G^&Xq3?qctd%8N1EB,nD9U'
-DB_NAME = 'anh_ajay_testing'
+class DatabaseNotConfigured(RuntimeError):
+    """Raised on first database use when no connection settings were given."""
 
-# Create database URL
-DATABASE_URL = f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+def url_from_env() -> str:
+    """DATABASE_URL, or a MySQL URL built from DB_HOST/DB_USERNAME/DB_PASSWORD/DB_NAME; '' when unset."""
+    if os.environ.get('DATABASE_URL'):
+        return os.environ['DATABASE_URL']
+    host = os.environ.get('DB_HOST')
+    username = os.environ.get('DB_USERNAME')
+    name = os.environ.get('DB_NAME')
+    if not (host and username and name):
+        return ''
+    password = quote_plus(os.environ.get('DB_PASSWORD', ''))
+    return f"mysql+pymysql://{quote_plus(username)}:{password}@{host}/{name}"
 
-# Create engine
-engine = create_engine(DATABASE_URL)
+# Database URL from the environment; there is deliberately no default database
+DATABASE_URL = url_from_env()
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine and session factory are built on first use, so importing this
+# module needs neither SQLAlchemy's driver nor a reachable database
+_engine = None
+_engine_options = {}
+_session_factory = None
+_lock = Lock()
 
-# Create base class for models
-Base = declarative_base()
+def configure(url: str = None, engine=None, **engine_options) -> None:
+    """Use a different database URL (with create_engine options) or a ready-made engine.
+
+    Used by the application factory and by tests and benchmarks running against SQLite.
+    """
+    global DATABASE_URL, _engine, _engine_options, _session_factory
+    with _lock:
+        if url:
+            DATABASE_URL = url
+        _engine = engine
+        _engine_options = engine_options
+        _session_factory = None
+
+def is_configured() -> bool:
+    """True when a database URL or engine has been provided."""
+    return _engine is not None or bool(DATABASE_URL)
+
+def get_engine():
+    """Create the engine on first use."""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise DatabaseNotConfigured(
+                        'No database configured: set DATABASE_URL, or DB_HOST, DB_USERNAME, '
+                        'DB_PASSWORD and DB_NAME, or call db_config.configure()')
+                from sqlalchemy import create_engine
+                _engine = create_engine(DATABASE_URL, **_engine_options)
+    return _engine
+
+def get_session_factory():
+    """Create the session factory on first use."""
+    global _session_factory
+    if _session_factory is None:
+        engine = get_engine()
+        with _lock:
+            if _session_factory is None:
+                from sqlalchemy.orm import sessionmaker
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_factory
+
+def __getattr__(name):
+    # Backwards compatible module attributes, created lazily
+    if name == 'engine':
+        return get_engine()
+    if name == 'SessionLocal':
+        return get_session_factory()
+    if name == 'Base':
+        from sqlalchemy.orm import declarative_base
+        global Base
+        Base = declarative_base()
+        return Base
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Dependency to get DB session
 def get_db():
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -1,10 +1,19 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 import json
+import os
+import time
 from dataclasses import dataclass
 from decimal import Decimal
-from sqlalchemy import text
-from db_config import get_db
+from cache import LRUCache
+import inventory_cache
+import price_calendar
+import rate_snapshot
+from singleflight import SingleFlight
+import metrics
+from admission import check_deadline
+from db_config import DatabaseNotConfigured, get_db
 
 # Map meal_plan_id to meal plan names
 MEAL_PLAN_MAP = {
@@ -14,6 +23,59 @@ MEAL_PLAN_MAP = {
     4: 'Room with Breakfast, Lunch and Dinner'
 }
 
+# Memoization limits for party splits and per-room stay prices
+PARTY_CACHE_SIZE = 1024
+STAY_PRICE_CACHE_SIZE = 16384
+
+# Global rate version; bump it to invalidate every cached stay price
+_rate_version = 0
+_stay_price_cache = LRUCache(STAY_PRICE_CACHE_SIZE)
+
+# Load units available per room and date from anh_room_inventory and prune rooms
+# that cannot supply enough units before pricing. Rooms without inventory rows
+# are treated as unlimited.
+ROOM_INVENTORY_ENABLED = os.environ.get('ROOM_INVENTORY', '').lower() in ('1', 'true', 'yes')
+
+# Concurrent identical inventory loads share one query; waiters give up after this many seconds
+INVENTORY_LOAD_TIMEOUT = 30
+_inventory_loads = SingleFlight(timeout=INVENTORY_LOAD_TIMEOUT)
+
+# Per-hotel lowest-price calendars for date pickers, extended one missing date range at a time
+PRICE_CALENDAR_SIZE = 1024
+PRICE_CALENDAR_TTL = int(os.environ.get('PRICE_CALENDAR_TTL', price_calendar.DEFAULT_TTL))
+
+# Optional host-wide inventory cache shared by all workers and on-disk rate snapshot,
+# set up by configure_inventory
+_shared_inventory = None
+_snapshot_reader = None
+RATE_SNAPSHOT_MAX_AGE = 300
+
+def configure_inventory(cache_url: str = '', cache_ttl: int = inventory_cache.DEFAULT_TTL,
+                        snapshot_dir: str = '', snapshot_max_age: int = 300) -> None:
+    """Set up the optional inventory tiers in front of the database.
+
+    cache_url selects the shared inventory cache (e.g. file:///dev/shm/hotel_search,
+    see inventory_cache.py). snapshot_dir holds the rate snapshot (see rate_snapshot.py),
+    which is served directly while younger than snapshot_max_age seconds and as a stale
+    fallback whenever the database fails.
+    """
+    global _shared_inventory, _snapshot_reader, RATE_SNAPSHOT_MAX_AGE
+    _shared_inventory = inventory_cache.from_url(cache_url, cache_ttl)
+    if _shared_inventory:
+        metrics.register_cache('shared_inventory', _shared_inventory.stats)
+    RATE_SNAPSHOT_MAX_AGE = snapshot_max_age
+    _snapshot_reader = rate_snapshot.SnapshotReader(snapshot_dir) if snapshot_dir else None
+    if _snapshot_reader:
+        # Map the snapshot now so the first search does not wait for it
+        _snapshot_reader.current()
+
+configure_inventory(
+    os.environ.get('INVENTORY_CACHE_URL', ''),
+    int(os.environ.get('INVENTORY_CACHE_TTL', inventory_cache.DEFAULT_TTL)),
+    os.environ.get('RATE_SNAPSHOT_DIR', ''),
+    int(os.environ.get('RATE_SNAPSHOT_MAX_AGE', 300))
+)
+
 def get_date_range(start: str, end: str) -> List[str]:
     """Get a list of dates between start and end (exclusive)."""
     start_date = datetime.strptime(start, '%Y-%m-%d')
@@ -25,6 +87,14 @@ def get_date_range(start: str, end: str) -> List[str]:
         current_date += timedelta(days=1)
     return date_range
 
+def room_available_units(room: Dict[str, Any], dates: Tuple[date, ...]) -> Optional[int]:
+    """Fewest units of a room available on any night of the stay, or None if unknown."""
+    availability = room.get('availability')
+    if not availability:
+        return None
+    units = [availability[date_obj] for date_obj in dates if date_obj in availability]
+    return min(units) if units else None
+
 def split_guests(n: int, k: int, m: int) -> List[List[int]]:
     """Split n guests into k rooms, each room max m, with minimum 1 guest per room."""
     results = []
@@ -75,221 +145,242 @@ def generate_distributions(n: int, k: int, m: int, min_per_room: int,
             results
         )
 
+def balanced_split(n: int, k: int, m: int) -> Tuple[int, ...]:
+    """Same as most_balanced_split(split_guests(n, k, m)) without enumerating every split.
+
+    The most balanced split differs by at most one guest between rooms and is
+    the lexicographically smallest, so fuller rooms come last. Returns () when
+    n guests cannot fit k rooms of at most m.
+    """
+    if n == 0:
+        return (0,) * k
+    base, extra = divmod(n, k)
+    if base + (1 if extra else 0) > m:
+        return ()
+    return (base,) * (k - extra) + (base + 1,) * extra
+
 def most_balanced_split(splits):
     # Sort by (max-min, then lexicographically)
     return sorted(splits, key=lambda x: (max(x)-min(x), x))[0] if splits else []
 
+def get_rate_version() -> int:
+    """Return the current rate version used to key cached stay prices."""
+    return _rate_version
+
+def bump_rate_version() -> int:
+    """Invalidate cached stay prices after rates change."""
+    global _rate_version
+    _rate_version += 1
+    _stay_price_cache.clear()
+    return _rate_version
+
+def price_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the memoized pricing helpers."""
+    party_info = split_party.cache_info()
+    return {
+        'rate_version': _rate_version,
+        'stay_prices': _stay_price_cache.stats(),
+        'party_splits': {
+            'size': party_info.currsize,
+            'maxsize': party_info.maxsize,
+            'hits': party_info.hits,
+            'misses': party_info.misses
+        }
+    }
+
+def clear_price_caches() -> None:
+    """Drop every memoized pricing result."""
+    _stay_price_cache.clear()
+    _price_calendar.clear()
+    stay_dates.cache_clear()
+    split_party.cache_clear()
+    bucket_children.cache_clear()
+
+def _party_split_stats() -> Dict[str, Any]:
+    info = split_party.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+@lru_cache(maxsize=1024)
+def stay_dates(check_in: str, check_out: str) -> Tuple[date, ...]:
+    """Get the nights of a stay as date objects (memoized)."""
+    return tuple(datetime.strptime(d, '%Y-%m-%d').date() for d in get_date_range(check_in, check_out))
+
+@lru_cache(maxsize=PARTY_CACHE_SIZE)
+def split_party(adults: int, num_rooms: int, max_adults: int,
+                num_children: int, max_children: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Most balanced adults and children per room for a party shape (memoized)."""
+    adults_per_room = balanced_split(adults, num_rooms, max_adults)
+    if not num_children:
+        return adults_per_room, (0,) * num_rooms
+    return adults_per_room, balanced_split(num_children, num_rooms, max_children)
+
+@lru_cache(maxsize=PARTY_CACHE_SIZE)
+def bucket_children(children_ages: Tuple[int, ...], children_per_room: Tuple[int, ...],
+                    free_child_age: int) -> Tuple[Tuple[Tuple[int, ...], int, int], ...]:
+    """Assign children ages to rooms and count paid/free children per room (memoized)."""
+    rooms = []
+    offset = 0
+    for num_children in children_per_room:
+        c_ages = children_ages[offset:offset + num_children]
+        offset += num_children
+        paid_children = sum(1 for age in c_ages if age > free_child_age)
+        rooms.append((c_ages, paid_children, len(c_ages) - paid_children))
+    return tuple(rooms)
+
+def room_stay_price(room: Dict[str, Any], adults: int, paid_children: int,
+                    dates: Tuple[date, ...], meal_plan: str) -> Tuple[float, Tuple[Tuple[str, Any, Any, Any], ...]]:
+    """Price one room for a stay, memoized per (room, party, stay, meal plan, rate version).
+
+    Returns the room total and a (date, base_price, children_price, total) tuple per night.
+    """
+    key = (room['dist_room_id'], _rate_version, room.get('rate_version'),
+           adults, paid_children, dates[0], dates[-1], len(dates), meal_plan)
+    cached = _stay_price_cache.get(key)
+    if cached is not None:
+        return cached
+
+    pricing = room['pricing']
+    room_price = 0
+    nightly = []
+    for date_obj in dates:
+        date_pricing = pricing[date_obj]
+
+        # Calculate base price based on number of adults
+        if adults == 1:
+            # Special case: 1 adult + 1 paid child should be priced as 2 adults
+            if paid_children == 1:
+                base_price = date_pricing['2A'][meal_plan]
+            else:
+                base_price = date_pricing['1A'][meal_plan]
+        elif adults == 2:
+            base_price = date_pricing['2A'][meal_plan]
+        else:
+            # For more than 2 adults, use 2A price as base and add extra adult price
+            base_price = date_pricing['2A'][meal_plan] + (adults - 2) * date_pricing['EA'][meal_plan]
+
+        # Add price for paid children, but skip if this is the 1A+1C case with paid child
+        if not (adults == 1 and paid_children == 1):
+            children_price = paid_children * date_pricing['EC'][meal_plan]
+        else:
+            children_price = 0
+
+        daily_price = base_price + children_price
+        room_price += daily_price
+        nightly.append((date_obj.strftime('%Y-%m-%d'), base_price, children_price, daily_price))
+
+    result = (room_price, tuple(nightly))
+    _stay_price_cache.put(key, result)
+    return result
+
 def allocate_rooms_and_calculate_price(room: Dict[str, Any], adults: int, 
                                      children_ages: List[int], check_in: str, 
                                      check_out: str, num_rooms: int, 
                                      meal_plan: str) -> Dict[str, Any]:
     """Main allocation and pricing logic."""
-    print("\n=== Starting allocate_rooms_and_calculate_price ===")
-    print(f"Room: {room['room_name']}")
-    print(f"Adults: {adults}, Children: {children_ages}")
-    print(f"Check-in: {check_in}, Check-out: {check_out}")
-    print(f"Number of rooms: {num_rooms}")
-    print(f"Meal plan: {meal_plan}")
-    
+    print(f"\n=== allocate_rooms_and_calculate_price: {room['room_name']} ({meal_plan}) ===")
+    print(f"Adults: {adults}, Children: {children_ages}, Rooms: {num_rooms}, Stay: {check_in} - {check_out}")
+
     max_adults = room['max_adults']
     max_children = room['max_children']
     max_occupancy = room['max_occupancy']
     free_child_age = room['free_child_age']
     pricing = room['pricing']
-    dates = get_date_range(check_in, check_out)
-    # Convert string dates to datetime.date objects for comparison
-    date_objects = [datetime.strptime(date, '%Y-%m-%d').date() for date in dates]
-    best_price = None
-    best_allocation = None
-
-    print(f"\nRoom limits:")
-    print(f"Max adults: {max_adults}")
-    print(f"Max children: {max_children}")
-    print(f"Max occupancy: {max_occupancy}")
-    print(f"Free child age: {free_child_age}")
+    date_objects = stay_dates(check_in, check_out)
+    invalid = {
+        'error': True,
+        'price': None,
+        'allocation': None
+    }
 
     # Ensure at least one adult per room
     if adults < num_rooms:
         print("\nNot enough adults for rooms")
-        return {
-            'error': True,
-            'price': None,
-            'allocation': None
-        }
+        return invalid
+
+    if not date_objects:
+        print("\nNo nights in stay")
+        return invalid
 
     # Check if pricing exists for all dates
-    print("pricing", pricing)
-    print("dates", date_objects)
     for date_obj in date_objects:
         if date_obj not in pricing:
             print(f"\nNo pricing for date: {date_obj}")
-            return {
-                'error': True,
-                'price': None,
-                'allocation': None
-            }
+            return invalid
 
-    # Get all possible ways to split adults into rooms
-    adult_splits = split_guests(adults, num_rooms, max_adults)
-    print(f"\nAdult splits: {adult_splits}")
-    adults_per_room = most_balanced_split(adult_splits)
-    print(f"Most balanced adults per room: {adults_per_room}")
-    
-    # Get all possible ways to split children into rooms
-    child_splits = [[0]] if not children_ages else split_guests(len(children_ages), num_rooms, max_children)
-    print(f"Child splits: {child_splits}")
-    children_per_room = most_balanced_split(child_splits)
-    print(f"Most balanced children per room: {children_per_room}")
+    # Most balanced way to split adults and children into rooms
+    adults_per_room, children_per_room = split_party(
+        adults, num_rooms, max_adults, len(children_ages), max_children
+    )
+    if len(adults_per_room) != num_rooms or len(children_per_room) != num_rooms:
+        print("\nNo valid guest split for rooms")
+        return invalid
+    children_rooms = bucket_children(tuple(children_ages), children_per_room, free_child_age)
+    print(f"Adults per room: {adults_per_room}, Children per room: {children_per_room}")
 
-    # Calculate total guests
-    total_guests = adults + len(children_ages)
-    guests_per_room = total_guests / num_rooms
-    print(f"\nTotal guests: {total_guests}")
-    print(f"Average guests per room: {guests_per_room}")
-
-    children_ages_copy = children_ages.copy()
-    children_ages_rooms = []
-    # If no children, create empty arrays for each room
-    if not children_ages:
-        children_ages_rooms = [[] for _ in range(num_rooms)]
-    else:
-        for num_children in children_per_room:
-            children_ages_rooms.append(children_ages_copy[:num_children])
-            children_ages_copy = children_ages_copy[num_children:]
-
-    valid = True
     total_price = 0
     allocation = []
 
     for i in range(num_rooms):
         a = adults_per_room[i]
-        c_ages = children_ages_rooms[i]
+        c_ages, paid_children, free_children = children_rooms[i]
         c = len(c_ages)
 
-        print(f"\nRoom {i+1}:")
-        print(f"Adults: {a}, Children ages: {c_ages}")
-
         # Validate room occupancy - allow if total guests per room is within limits
         if a < 1 or a > max_adults or c > max_children:
             print("Invalid room occupancy - exceeds max adults or children")
-            valid = False
-            break
+            return invalid
 
         # Check if total occupancy is within limits
         if a + c > max_occupancy:
             print(f"Room {i+1} exceeds max occupancy: {a + c} > {max_occupancy}")
-            valid = False
-            break
-
-        room_price = 0
-        daily_prices = []
-
-        for date_obj in date_objects:
-            print(f"\nDate: {date_obj}")
-            date_pricing = pricing[date_obj]
-            base_price = 0
-
-            # Calculate base price based on number of adults
-            if a == 1:
-                # Check if this is the special case of 1 adult + 1 paid child
-                paid_children = sum(1 for age in c_ages if age > free_child_age)
-                if paid_children == 1:
-                    # Special case: 1 adult + 1 paid child should be priced as 2 adults
-                    base_price = date_pricing['2A'][meal_plan]
-                    print(f"Special case: 1 adult + 1 paid child using 2A price: {base_price}")
-                else:
-                    base_price = date_pricing['1A'][meal_plan]
-                    print(f"Single adult price: {base_price}")
-            elif a == 2:
-                base_price = date_pricing['2A'][meal_plan]
-                print(f"Double adult price: {base_price}")
-            else:
-                # For more than 2 adults, use 2A price as base and add extra adult price
-                base_price = date_pricing['2A'][meal_plan]
-                extra_adults = a - 2
-                extra_price = extra_adults * date_pricing['EA'][meal_plan]
-                base_price += extra_price
-                print(f"Double adult base: {date_pricing['2A'][meal_plan]}")
-                print(f"Extra adults ({extra_adults}) price: {extra_price}")
-                print(f"Total base price: {base_price}")
-
-            # Calculate children price
-            paid_children = 0
-            free_children = 0
-            for age in c_ages:
-                if age > free_child_age:
-                    paid_children += 1
-                else:
-                    free_children += 1
-
-            print(f"Paid children: {paid_children}, Free children: {free_children}")
-
-            if paid_children > max_children:
-                print("Too many paid children")
-                valid = False
-                break
+            return invalid
+
+        if paid_children > max_children:
+            print("Too many paid children")
+            return invalid
+
+        room_price, nightly = room_stay_price(room, a, paid_children, date_objects, meal_plan)
+        daily_prices = [{
+            'date': night_date,
+            'base_price': base_price,
+            'children_price': children_price,
+            'total': daily_price,
+            'adults': a,
+            'paid_children': paid_children,
+            'free_children': free_children
+        } for night_date, base_price, children_price, daily_price in nightly]
 
-            # Add price for paid children, but skip if this is the 1A+1C case with paid child
-            if not (a == 1 and paid_children == 1):
-                children_price = paid_children * date_pricing['EC'][meal_plan]
-                print(f"Children price: {children_price}")
-            else:
-                children_price = 0
-                print("Skipping children price for 1A+1C case with paid child")
-            
-            # Calculate total price for this day
-            daily_price = base_price + children_price
-            print(f"Daily total: {daily_price}")
-            
-            # Add to room total
-            room_price += daily_price
-
-            daily_prices.append({
-                'date': date_obj.strftime('%Y-%m-%d'),  # Convert back to string for JSON
-                'base_price': base_price,
-                'children_price': children_price,
-                'total': daily_price,
-                'adults': a,
-                'paid_children': paid_children,
-                'free_children': free_children
-            })
-
-        if not valid:
-            break
-
-        print(f"\nRoom {i+1} total price: {room_price}")
         allocation.append({
             'adults': a,
-            'children': c_ages,
+            'children': list(c_ages),
             'paid_children': paid_children,
             'free_children': free_children,
             'room_price': room_price,
             'daily_prices': daily_prices,
-            'nights': len(dates),
-            'price_per_night': room_price / len(dates)
+            'nights': len(date_objects),
+            'price_per_night': room_price / len(date_objects)
         })
         total_price += room_price
 
-    if valid:
-        print(f"\nValid allocation found with price: {total_price}")
-        best_price = total_price
-        best_allocation = allocation
-    else:
-        best_price = None
-        best_allocation = None
-
-    print("\n=== Finished allocate_rooms_and_calculate_price ===")
-    print(f"Best price: {best_price}")
+    print(f"Best price: {total_price}")
     return {
-        'error': best_price is None,
-        'price': best_price,
-        'allocation': best_allocation
+        'error': False,
+        'price': total_price,
+        'allocation': allocation
     }
 
+metrics.register_cache('stay_prices', _stay_price_cache.stats)
+metrics.register_cache('party_splits', _party_split_stats)
+metrics.register_cache('inventory_loads', _inventory_loads.stats)
+
 def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str, 
                  brand_id: str, adults: int, children_ages: List[int], 
-                 check_in: str, check_out: str, rooms_required: int) -> List[Dict[str, Any]]:
-    """Main search function."""
+                 check_in: str, check_out: str, rooms_required: int,
+                 deadline: float = float('inf')) -> List[Dict[str, Any]]:
+    """Main search function.
+
+    Raises SearchBudgetExceeded once time.monotonic() passes deadline.
+    """
     print("\n=== Starting search_hotels ===")
     print(f"Search parameters:")
     print(f"City: {city}")
@@ -303,14 +394,21 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
     print(f"Total hotels to process: {len(hotels)}")
     
     results = []
-    dates = get_date_range(check_in, check_out)
-    # Convert string dates to datetime.date objects for comparison
-    date_objects = [datetime.strptime(date, '%Y-%m-%d').date() for date in dates]
+    date_objects = stay_dates(check_in, check_out)
     grouped_hotels = {}
     
     # Calculate total guests
     total_guests = adults + len(children_ages)
     print(f"\nTotal guests: {total_guests}")
+
+    # Stage timings and counts, recorded once per search
+    completeness_time = 0.0
+    pricing_time = 0.0
+    hotels_considered = 0
+    rooms_considered = 0
+    rooms_pruned = 0
+    rooms_sold_out = 0
+    meal_plans_priced = 0
     
     for hotel in hotels:
         print(f"\nProcessing hotel: {hotel.get('hotel_name', 'Unknown')}")
@@ -334,6 +432,7 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
             continue
 
         print("Hotel passed initial filters")
+        hotels_considered += 1
         
         # Group hotels by hotel_id
         hotel_key = hotel['hotel_id']
@@ -355,7 +454,7 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
                 'brand_id': hotel.get('brand_id', ''),
                 'check_in': check_in,
                 'check_out': check_out,
-                'nights': len(dates),
+                'nights': len(date_objects),
                 'rooms_required': rooms_required,  # Initial value
                 'adults': adults,
                 'children_ages': children_ages,
@@ -387,6 +486,7 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
         print("\nProcessing room types:")
         for room in hotel['rooms']:
             print(f"\nRoom type: {room.get('room_name', 'Unknown')}")
+            check_deadline(deadline)
             
             # Calculate min rooms needed for this specific room type
             max_adults = room['max_adults']
@@ -415,6 +515,14 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
             actual_rooms = max(rooms_required, min_rooms_needed)
             print(f"Actual rooms to use for this room type: {actual_rooms}")
 
+            # Skip room types that cannot supply enough units before any pricing work
+            rooms_considered += 1
+            available_units = room_available_units(room, date_objects)
+            if available_units is not None and available_units < actual_rooms:
+                print(f"Skipping room - {available_units} units available, {actual_rooms} required")
+                rooms_sold_out += 1
+                continue
+
             # Create custom room message if needed
             if rooms_required < min_rooms_needed:
                 custom_room_message = f"To accommodate {adults} adult{'s' if adults > 1 else ''}" + \
@@ -424,6 +532,7 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
                 grouped_hotels[hotel_key]['custom_room_message'] = custom_room_message
             
             # Check if room has pricing for all required dates
+            completeness_start = time.perf_counter()
             has_all_dates = True
             for date_obj in date_objects:
                 print(f"Checking date: {date_obj}")
@@ -453,14 +562,18 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
                         has_all_dates = False
                         break
 
+            completeness_time += time.perf_counter() - completeness_start
+
             # Skip room if not available for all dates
             if not has_all_dates:
+                rooms_pruned += 1
                 print("Skipping room - missing pricing data")
                 continue
 
             print("Room has complete pricing data")
 
             # Try each meal plan
+            pricing_start = time.perf_counter()
             meal_plan_results = {}
             print("\nProcessing meal plans:")
             for meal_plan_id, meal_plan in MEAL_PLAN_MAP.items():
@@ -469,6 +582,7 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
                     room, adults, children_ages, check_in, check_out, 
                     actual_rooms, meal_plan
                 )
+                meal_plans_priced += 1
                 
                 if not allocation_result['error']:
                     print(f"Valid allocation found for {meal_plan}")
@@ -481,6 +595,8 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
                 else:
                     print(f"No valid allocation for {meal_plan}")
 
+            pricing_time += time.perf_counter() - pricing_start
+
             if meal_plan_results:
                 print(f"Adding room with {len(meal_plan_results)} valid meal plans")
                 grouped_hotels[hotel_key]['rooms'].append({
@@ -492,12 +608,21 @@ def search_hotels(hotels: List[Dict[str, Any]], city: str, hotel_id: str,
                     'room_size': room.get('room_size', ''),
                     'extra_bed': room.get('extra_bed', ''),
                     'featured_photo': room.get('featured_photo', ''),
+                    'available_units': available_units,
                     'meal_plans': meal_plan_results,
                     'allocation': meal_plan_results[list(meal_plan_results.keys())[0]]['allocation']
                 })
             else:
                 print("No valid meal plans found for room")
 
+    metrics.observe_duration('completeness', completeness_time)
+    metrics.observe_duration('pricing', pricing_time)
+    metrics.observe_count('hotels_considered', hotels_considered)
+    metrics.observe_count('rooms_considered', rooms_considered)
+    metrics.observe_count('rooms_pruned', rooms_pruned)
+    metrics.observe_count('rooms_sold_out', rooms_sold_out)
+    metrics.observe_count('meal_plans_priced', meal_plans_priced)
+
     # Convert grouped hotels to list
     results = list(grouped_hotels.values())
     print("results", results)
@@ -523,12 +648,103 @@ def get_hotels_structured(city_id: Optional[str] = None,
                          check_in: Optional[str] = None,
                          check_out: Optional[str] = None,
                          distributor_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get structured hotel data from database."""
+    """Get structured hotel data from database.
+
+    A fresh rate snapshot or the shared inventory cache is used when
+    configured. Otherwise concurrent calls with the same filters share a single
+    query; if it fails, a covering snapshot is served with every hotel marked
+    'rates_stale'. The returned hotels may be shared between callers and must
+    not be mutated.
+    """
+    snapshot = _snapshot_reader.current() if _snapshot_reader else None
+    if snapshot and not snapshot.covers(check_in, check_out, distributor_id):
+        snapshot = None
+    if snapshot and snapshot.age() <= RATE_SNAPSHOT_MAX_AGE:
+        return snapshot.get_hotels(city_id, hotel_id, brand_id, check_in, check_out)
+
+    key = (city_id, hotel_id, brand_id, check_in, check_out, distributor_id)
+    if _shared_inventory:
+        hotels = _shared_inventory.get(key)
+        if hotels is not None:
+            return hotels
+
+    def load():
+        hotels = _query_hotels_structured(city_id, hotel_id, brand_id, check_in, check_out, distributor_id)
+        if _shared_inventory:
+            _shared_inventory.set(key, hotels)
+        return hotels
+
     try:
-        db = next(get_db())
-        
+        return _inventory_loads.do(key, load)
+    except Exception as e:
+        print(f"Database error: {str(e)}")
+        if not snapshot:
+            if isinstance(e, DatabaseNotConfigured):
+                # Missing settings are not an outage; fail loudly instead of reporting no hotels
+                raise
+            return []
+        print(f"Serving stale rate snapshot from {snapshot.as_of()}")
+        hotels = snapshot.get_hotels(city_id, hotel_id, brand_id, check_in, check_out)
+        for hotel in hotels:
+            hotel['rates_stale'] = True
+            hotel['rates_as_of'] = snapshot.as_of()
+        return hotels
+
+def refresh_rate_snapshot(directory: str, days: int = 180,
+                          distributor_id: Optional[str] = None) -> str:
+    """Load the next days of rates from the database and publish them as the current snapshot."""
+    start = date.today()
+    end = start + timedelta(days=days - 1)
+    hotels = _query_hotels_structured(None, None, None, start.strftime('%Y-%m-%d'),
+                                      end.strftime('%Y-%m-%d'), distributor_id)
+    return rate_snapshot.write_snapshot(directory, hotels, start, days,
+                                        list(MEAL_PLAN_MAP.values()), distributor_id)
+
+def _load_calendar_rates(hotel_id: str, check_in: str, check_out: str,
+                         distributor_id: Optional[str]) -> List[Dict[str, Any]]:
+    return get_hotels_structured(hotel_id=hotel_id, check_in=check_in, check_out=check_out,
+                                 distributor_id=distributor_id)
+
+_price_calendar = price_calendar.PriceCalendar(_load_calendar_rates, get_rate_version,
+                                               PRICE_CALENDAR_SIZE, PRICE_CALENDAR_TTL)
+metrics.register_cache('price_calendar', _price_calendar.stats)
+
+def get_price_calendar(hotel_id: str, start: str, end: str,
+                       distributor_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Lowest price per night, room type and meal plan for nights start up to end.
+
+    Only nights missing from the hotel's cached calendar are loaded. Returns
+    None when the hotel has no rates in the window.
+    """
+    first = datetime.strptime(start, '%Y-%m-%d').date()
+    last = datetime.strptime(end, '%Y-%m-%d').date()
+    with metrics.span('calendar'):
+        return _price_calendar.get(hotel_id, first, last, distributor_id)
+
+def invalidate_inventory_cache() -> None:
+    """Drop cached inventory and stay prices after rates change."""
+    if _shared_inventory:
+        _shared_inventory.invalidate()
+    bump_rate_version()
+
+def _query_hotels_structured(city_id: Optional[str], hotel_id: Optional[str], brand_id: Optional[str],
+                             check_in: Optional[str], check_out: Optional[str],
+                             distributor_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Run the inventory query and assemble hotels, rooms and pricing."""
+    # Imported on first query so importing this module stays cheap
+    from sqlalchemy import text
+    db = next(get_db())
+    try:
+        inventory_select = ''
+        inventory_join = ''
+        if ROOM_INVENTORY_ENABLED:
+            inventory_select = """,
+                inv.available_rooms"""
+            inventory_join = """
+            LEFT JOIN anh_room_inventory inv ON inv.dist_room_id = p.dist_room_id AND inv.date = p.date"""
+
         # Base query
-        query = """
+        query = f"""
             SELECT 
                 h.id AS hotel_id,
                 h.hotel_name,
@@ -559,7 +775,7 @@ def get_hotels_structured(city_id: Optional[str] = None,
                 p.meal_plan_id,
                 mb.brand_group AS brand_name,
                 mb.id AS brand_id,
-                rl.id AS dist_room_id
+                rl.id AS dist_room_id{inventory_select}
             FROM anh_hotels h
             JOIN anh_master_city mc ON h.city_id = mc.id
             JOIN anh_master_hotel_category amhc ON h.hotel_type_id = amhc.id
@@ -567,7 +783,7 @@ def get_hotels_structured(city_id: Optional[str] = None,
             JOIN anh_distributor_hotels_list dhl ON h.id = dhl.hotel_id
             JOIN anh_hotel_rooms r ON h.id = r.hotel_id
             JOIN anh_distributor_rooms_list rl ON rl.dist_hotel_id = dhl.id and rl.room_id = r.id
-            JOIN anh_room_pricing p ON dhl.id = p.dist_hotel_id AND p.dist_room_id = rl.id
+            JOIN anh_room_pricing p ON dhl.id = p.dist_hotel_id AND p.dist_room_id = rl.id{inventory_join}
             WHERE h.is_active = 1 AND h.is_delete = 0
               AND r.is_active = 1 AND r.is_delete = 0
               AND dhl.is_active = 1 AND dhl.is_delete = 0
@@ -601,11 +817,15 @@ def get_hotels_structured(city_id: Optional[str] = None,
         query += " ORDER BY h.hotel_name, r.room_name, p.date"
             
         # Execute query
-        result = db.execute(text(query), params)
-        rows = result.fetchall()
+        with metrics.span('sql'):
+            result = db.execute(text(query), params)
+            rows = result.fetchall()
+        metrics.observe_count('rows_fetched', len(rows))
         
         # Process results
+        assemble_start = time.perf_counter()
         hotels = {}
+        rates = {}
         for row in rows:
             hotel_id = row.hotel_id
             room_id = row.room_id
@@ -643,8 +863,10 @@ def get_hotels_structured(city_id: Optional[str] = None,
                     'max_occupancy': row.max_occupancy,
                     'free_child_age': row.free_child_age_limit,
                     'featured_photo': row.featured_photo,
-                    'pricing': {}
+                    'pricing': {},
+                    'availability': {}
                 }
+                rates[room_id] = []
 
             if date not in hotels[hotel_id]['rooms'][room_id]['pricing']:
                 hotels[hotel_id]['rooms'][room_id]['pricing'][date] = {
@@ -654,6 +876,13 @@ def get_hotels_structured(city_id: Optional[str] = None,
                     'EC': {}
                 }
 
+            if ROOM_INVENTORY_ENABLED and row.available_rooms is not None:
+                hotels[hotel_id]['rooms'][room_id]['availability'][date] = row.available_rooms
+
+            # Remember the raw rates so cached stay prices can be keyed on them
+            rates[room_id].append((date, row.meal_plan_id, row.price_adult_1,
+                                   row.price_adult_2, row.extra_adult, row.extra_child))
+
             # Fill pricing for each occupancy type and meal plan
             hotels[hotel_id]['rooms'][room_id]['pricing'][date]['1A'][meal_plan] = row.price_adult_1
             hotels[hotel_id]['rooms'][room_id]['pricing'][date]['2A'][meal_plan] = row.price_adult_2
@@ -665,12 +894,10 @@ def get_hotels_structured(city_id: Optional[str] = None,
             hotel['rooms'] = list(hotel['rooms'].values())
             for room in hotel['rooms']:
                 room['pricing'] = dict(sorted(room['pricing'].items()))
+                room['rate_version'] = hash(tuple(rates[room['room_id']]))
+        metrics.observe_duration('assemble', time.perf_counter() - assemble_start)
 
         return list(hotels.values())
-        
-    except Exception as e:
-        print(f"Database error: {str(e)}")
-        return []
     finally:
         db.close()
 
@@ -0,0 +1,204 @@
+"""Host-wide inventory cache shared by every worker process.
+
+Loaded inventory (the get_hotels_structured result for a set of filters) is
+stored once in a shared backend instead of in each worker's memory. Backends:
+
+- ``file:///dev/shm/hotel_search``: one file per key on a local (ideally
+  tmpfs) directory, written atomically; needs no extra services.
+- ``redis://localhost:6379/0``: a local or remote Redis server (requires the
+  optional ``redis`` package).
+
+Entries are namespaced by a generation number held in the backend, so
+``invalidate()`` from any process switches every worker to fresh data at once.
+Values are pickled, so the cache location must only be writable by the service.
+"""
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+import time
+from threading import Lock
+from typing import Any, Dict, Hashable, List, Optional
+from urllib.parse import urlparse
+
+DEFAULT_TTL = 300
+
+class CacheBackend:
+    """Minimal bytes key/value interface implemented by every backend."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer counter and return the new value."""
+        raise NotImplementedError
+
+class FileBackend(CacheBackend):
+    """Shared directory backend; each value is prefixed with its expiry time."""
+
+    _header = struct.Struct('!d')
+
+    # Expired entries (including older generations) are swept every this many writes
+    sweep_every = 256
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < self._header.size:
+            return None
+        (expires,) = self._header.unpack_from(data)
+        if expires and expires < time.time():
+            return None
+        return data[self._header.size:]
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        expires = time.time() + ttl if ttl else 0.0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self._header.pack(expires))
+                f.write(value)
+            # Readers see either the old or the new file, never a partial one
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if name.startswith('.') or name.endswith('.lock'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'rb') as f:
+                    header = f.read(self._header.size)
+                if len(header) == self._header.size:
+                    (expires,) = self._header.unpack(header)
+                    if expires and expires < now:
+                        os.unlink(path)
+                        removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def incr(self, key: str) -> int:
+        import fcntl  # POSIX only; the lock serializes increments across processes
+        with open(self._path(key) + '.lock', 'a+') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self.get(key)
+            value = int(current) + 1 if current else 1
+            self.set(key, str(value).encode(), 0)
+            return value
+
+class RedisBackend(CacheBackend):
+    """Redis backend for a cache server shared by the host (or hosts)."""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis package is required for redis:// inventory cache URLs")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl or None)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+def backend_from_url(url: str) -> Optional[CacheBackend]:
+    """Create the backend for a cache URL, or None when the URL is empty."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return FileBackend(parsed.path)
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported inventory cache URL: {url}")
+
+class SharedInventoryCache:
+    """Generation-namespaced cache of loaded inventory on a shared backend."""
+
+    generation_key = 'hotel_search:inventory:generation'
+
+    def __init__(self, backend: CacheBackend, ttl: int = DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _generation(self) -> str:
+        return (self.backend.get(self.generation_key) or b'0').decode()
+
+    def _key(self, key: Hashable) -> str:
+        return f"hotel_search:inventory:{self._generation()}:{key!r}"
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Cached inventory for key, or None. Backend failures and unreadable values count as misses."""
+        hotels = None
+        try:
+            data = self.backend.get(self._key(key))
+            if data is not None:
+                hotels = pickle.loads(data)
+        except Exception as e:
+            print(f"Inventory cache error: {str(e)}")
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            if hotels is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return hotels
+
+    def set(self, key: Hashable, hotels: List[Dict[str, Any]]) -> None:
+        try:
+            self.backend.set(self._key(key), pickle.dumps(hotels, protocol=pickle.HIGHEST_PROTOCOL), self.ttl)
+        except Exception as e:
+            print(f"Inventory cache error: {str(e)}")
+            with self._lock:
+                self.errors += 1
+
+    def invalidate(self) -> int:
+        """Start a new generation so every worker stops reading older entries."""
+        return self.backend.incr(self.generation_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+def from_url(url: str, ttl: int = DEFAULT_TTL) -> Optional[SharedInventoryCache]:
+    """Shared inventory cache for url, or None when no URL is configured."""
+    backend = backend_from_url(url)
+    return SharedInventoryCache(backend, ttl) if backend else None
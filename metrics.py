@@ -0,0 +1,135 @@
+"""In-process search metrics exposed in Prometheus text format.
+
+Stages are timed with ``span('name')`` and item counts (rows fetched, rooms
+pruned, ...) recorded with ``observe_count``. Both are aggregated into
+histograms; spans also feed the optional per-response Server-Timing header.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+# Cache name -> callable returning {'hits': ..., 'misses': ..., 'size': ...}
+_caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+# Spans recorded for the request being handled, if any
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('request_timings', default=None)
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a single label."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = {
+                    'buckets': [0] * (len(self.buckets) + 1),
+                    'sum': 0.0,
+                    'count': 0
+                }
+            series['buckets'][bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['buckets']):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {series["count"]}')
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+STAGE_DURATION = Histogram(
+    'search_stage_duration_seconds', 'Time spent in each search stage.', 'stage', DURATION_BUCKETS
+)
+STAGE_ITEMS = Histogram(
+    'search_stage_items', 'Items handled per search (rows, hotels, rooms, meal plans).', 'kind', COUNT_BUCKETS
+)
+
+def observe_duration(stage: str, seconds: float) -> None:
+    """Record a stage duration and add it to the current request's timings."""
+    STAGE_DURATION.observe(stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+def observe_count(kind: str, value: int) -> None:
+    """Record how many items a stage handled."""
+    STAGE_ITEMS.observe(kind, value)
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_duration(stage, time.perf_counter() - start)
+
+def start_request() -> None:
+    """Begin collecting spans for the current request."""
+    _request_timings.set([])
+
+def end_request() -> None:
+    """Stop collecting spans so later work on a reused thread is not added to this request."""
+    _request_timings.set(None)
+
+def request_timings() -> List[Tuple[str, float]]:
+    """Spans recorded so far for the current request."""
+    return list(_request_timings.get() or [])
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """Format spans as a Server-Timing header value (durations in ms)."""
+    return ', '.join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings)
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    """Expose a cache's hit/miss/size counters on the metrics endpoint."""
+    _caches[name] = stats
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Current counters of every registered cache."""
+    return {name: stats() for name, stats in sorted(_caches.items())}
+
+def _render_caches() -> List[str]:
+    lines = []
+    stats = cache_stats()
+    for metric, key, kind, help_text in (
+        ('search_cache_hits_total', 'hits', 'counter', 'Cache lookups served from cache.'),
+        ('search_cache_misses_total', 'misses', 'counter', 'Cache lookups that had to compute.'),
+        ('search_cache_entries', 'size', 'gauge', 'Entries currently held in the cache.'),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for name, values in stats.items():
+            lines.append(f'{metric}{{cache="{name}"}} {values.get(key, 0)}')
+    return lines
+
+def render_prometheus() -> str:
+    """Render every metric in Prometheus text exposition format."""
+    return '\n'.join(STAGE_DURATION.render() + STAGE_ITEMS.render() + _render_caches()) + '\n'
+
+def reset() -> None:
+    """Drop all recorded metrics."""
+    STAGE_DURATION.reset()
+    STAGE_ITEMS.reset()
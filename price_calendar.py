@@ -0,0 +1,217 @@
+"""Per-hotel lowest-price calendars for date pickers, extended incrementally.
+
+A hotel's calendar holds, for each room type and meal plan, the lowest nightly
+price (single or double occupancy) of every night loaded so far, together with
+the ranges of nights it covers. A request for a window only loads the nights
+not covered yet and merges them in, so a date picker scrolling week by week
+costs one small inventory query per new week instead of one per view.
+"""
+import time
+from datetime import date, timedelta
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cache import LRUCache
+
+# Calendars are rebuilt from scratch once older than this many seconds
+DEFAULT_TTL = 300
+
+DateRange = Tuple[date, date]
+
+def missing_ranges(covered: List[DateRange], start: date, end: date) -> List[DateRange]:
+    """Sub-ranges of [start, end) not inside any of the sorted, disjoint covered ranges."""
+    missing = []
+    cursor = start
+    for range_start, range_end in covered:
+        if range_end <= cursor:
+            continue
+        if range_start >= end:
+            break
+        if range_start > cursor:
+            missing.append((cursor, range_start))
+        cursor = max(cursor, range_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+def add_range(covered: List[DateRange], start: date, end: date) -> List[DateRange]:
+    """Covered ranges with [start, end) added, merging overlapping and adjacent ranges."""
+    merged = []
+    for range_start, range_end in sorted(covered + [(start, end)]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+def lowest_price(date_pricing: Dict[str, Dict[str, Any]], meal_plan: str) -> Optional[Any]:
+    """Lowest base price of a night for one meal plan, or None when it has no rate."""
+    prices = [date_pricing[occupancy_type].get(meal_plan) for occupancy_type in ('1A', '2A')]
+    prices = [price for price in prices if price is not None]
+    return min(prices) if prices else None
+
+def merge_hotels(calendar: Dict[str, Any], hotels: List[Dict[str, Any]], start: date, end: date) -> None:
+    """Fold the nights in [start, end) of loaded hotels into calendar."""
+    for hotel in hotels:
+        if calendar['hotel'] is None:
+            calendar['hotel'] = {key: value for key, value in hotel.items()
+                                 if key not in ('rooms', 'rates_stale', 'rates_as_of')}
+        for room in hotel['rooms']:
+            room_calendar = calendar['rooms'].setdefault(room['room_id'], {
+                'room_id': room['room_id'],
+                'room_name': room['room_name'],
+                'room_type': room['room_type'],
+                'prices': {},
+                'availability': {}
+            })
+            for date_obj, date_pricing in room['pricing'].items():
+                if not start <= date_obj < end:
+                    continue
+                prices = {}
+                for meal_plan in date_pricing['1A'].keys() | date_pricing['2A'].keys():
+                    price = lowest_price(date_pricing, meal_plan)
+                    if price is not None:
+                        prices[meal_plan] = price
+                if prices:
+                    room_calendar['prices'][date_obj] = prices
+            for date_obj, units in room.get('availability', {}).items():
+                if start <= date_obj < end:
+                    room_calendar['availability'][date_obj] = units
+
+def _new_calendar(version: Any) -> Dict[str, Any]:
+    return {
+        'hotel': None,
+        'rooms': {},
+        'covered': [],
+        'version': version,
+        'created': time.monotonic(),
+        'lock': Lock()
+    }
+
+def _copy_calendar(calendar: Dict[str, Any]) -> Dict[str, Any]:
+    copy = dict(calendar, rooms={}, lock=Lock())
+    for room_id, room in calendar['rooms'].items():
+        copy['rooms'][room_id] = dict(room, prices=dict(room['prices']), availability=dict(room['availability']))
+    return copy
+
+class PriceCalendar:
+    """Bounded cache of per-hotel price calendars, filled on demand by loader.
+
+    loader(hotel_id, check_in, check_out, distributor_id) returns hotels in
+    get_hotels_structured form with pricing for the nights check_in up to
+    check_out. version() returns the current rate version; calendars built
+    under an older version are discarded.
+    """
+
+    def __init__(self, loader: Callable[..., List[Dict[str, Any]]], version: Callable[[], Any],
+                 maxsize: int = 1024, ttl: int = DEFAULT_TTL):
+        self.loader = loader
+        self.version = version
+        self.ttl = ttl
+        self._calendars = LRUCache(maxsize)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.nights_loaded = 0
+
+    def _calendar(self, key: Tuple[str, Optional[str]]) -> Dict[str, Any]:
+        version = self.version()
+        with self._lock:
+            calendar = self._calendars.get(key)
+            if (calendar is None or calendar['version'] != version
+                    or time.monotonic() - calendar['created'] > self.ttl):
+                calendar = _new_calendar(version)
+                self._calendars.put(key, calendar)
+            return calendar
+
+    def get(self, hotel_id: str, start: date, end: date,
+            distributor_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Lowest prices per room type, meal plan and night in [start, end), or None without rates."""
+        calendar = self._calendar((str(hotel_id), distributor_id))
+        with calendar['lock']:
+            gaps = missing_ranges(calendar['covered'], start, end)
+
+        with self._lock:
+            if gaps:
+                self.misses += len(gaps)
+            else:
+                self.hits += 1
+        stale = None
+        stale_loads = []
+        for gap_start, gap_end in gaps:
+            hotels = self.loader(hotel_id, gap_start.strftime('%Y-%m-%d'),
+                                 gap_end.strftime('%Y-%m-%d'), distributor_id)
+            with self._lock:
+                self.nights_loaded += (gap_end - gap_start).days
+            stale_hotel = next((hotel for hotel in hotels if hotel.get('rates_stale')), None)
+            if stale_hotel:
+                # Stale fallback rates are served once but never cached
+                stale = stale_hotel['rates_as_of']
+                stale_loads.append((hotels, gap_start, gap_end))
+                continue
+            with calendar['lock']:
+                merge_hotels(calendar, hotels, gap_start, gap_end)
+                # An empty load may be a swallowed database error, so it is retried next time
+                if hotels:
+                    calendar['covered'] = add_range(calendar['covered'], gap_start, gap_end)
+
+        with calendar['lock']:
+            if not stale_loads:
+                return self._window(calendar, start, end, None)
+            view = _copy_calendar(calendar)
+        for hotels, gap_start, gap_end in stale_loads:
+            merge_hotels(view, hotels, gap_start, gap_end)
+        return self._window(view, start, end, stale)
+
+    def _window(self, calendar: Dict[str, Any], start: date, end: date,
+                stale: Optional[str]) -> Optional[Dict[str, Any]]:
+        if calendar['hotel'] is None:
+            return None
+        nights = [start + timedelta(days=i) for i in range((end - start).days)]
+        rooms = []
+        lowest = {}
+        for room in calendar['rooms'].values():
+            prices = {}
+            available_units = {}
+            for night in nights:
+                key = night.strftime('%Y-%m-%d')
+                if night in room['prices']:
+                    prices[key] = room['prices'][night]
+                units = room['availability'].get(night)
+                if units is not None:
+                    available_units[key] = units
+                # Sold-out nights do not count towards the hotel's lowest price
+                if night in room['prices'] and (units is None or units > 0):
+                    price = min(room['prices'][night].values())
+                    if key not in lowest or price < lowest[key]:
+                        lowest[key] = price
+            if prices:
+                rooms.append({
+                    'room_id': room['room_id'],
+                    'room_name': room['room_name'],
+                    'room_type': room['room_type'],
+                    'prices': prices,
+                    'available_units': available_units
+                })
+        result = dict(calendar['hotel'])
+        result.update({
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'lowest': dict(sorted(lowest.items())),
+            'rooms': rooms,
+            'stale': stale is not None
+        })
+        if stale:
+            result['ratesAsOf'] = stale
+        return result
+
+    def clear(self) -> None:
+        self._calendars.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Windows served without loading (hits), ranges loaded (misses) and nights loaded."""
+        return {
+            'size': len(self._calendars),
+            'hits': self.hits,
+            'misses': self.misses,
+            'nights_loaded': self.nights_loaded
+        }
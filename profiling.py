@@ -0,0 +1,48 @@
+"""Deterministic profiling of a single call, for on-demand slow-search diagnosis."""
+import cProfile
+import io
+import os
+import pstats
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Tuple
+
+def profile_call(fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, cProfile.Profile]:
+    """Run fn under cProfile and return its result with the profiler."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    return result, profiler
+
+def stats_text(profiler: cProfile.Profile, limit: int = 40, sort: str = 'cumulative') -> str:
+    """Top functions of a profile as pstats text."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+def collapsed_stacks(profiler: cProfile.Profile) -> str:
+    """Approximate collapsed stacks (caller;callee self_us) for flame graph tools.
+
+    cProfile only records caller/callee pairs, so stacks are two frames deep.
+    """
+    stats = pstats.Stats(profiler).stats
+    lines = []
+    for (filename, line, name), (_, _, self_time, _, callers) in stats.items():
+        callee = f"{os.path.basename(filename)}:{name}:{line}"
+        if not callers:
+            lines.append(f"{callee} {int(self_time * 1e6)}")
+            continue
+        for (c_file, c_line, c_name), caller_stats in callers.items():
+            # caller_stats is (calls, primitive calls, self time, cumulative time)
+            caller = f"{os.path.basename(c_file)}:{c_name}:{c_line}"
+            lines.append(f"{caller};{callee} {int(caller_stats[2] * 1e6)}")
+    return '\n'.join(sorted(lines)) + '\n'
+
+def save_profile(profiler: cProfile.Profile, directory: str, label: str = 'search') -> str:
+    """Write a profile as .prof (pstats) and .folded (collapsed stacks); return the base name."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"{label}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(directory, name + '.prof'))
+    with open(os.path.join(directory, name + '.folded'), 'w') as f:
+        f.write(collapsed_stacks(profiler))
+    return name
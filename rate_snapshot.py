@@ -0,0 +1,342 @@
+"""Versioned on-disk snapshot of hotel metadata and rate calendars.
+
+A snapshot is a single file that workers memory-map, so a freshly started
+worker can serve searches in milliseconds without the database, and all
+workers on a host share the same pages. Layout:
+
+    magic b'HSRS' | format u16 | reserved u16 | metadata length u32
+    metadata (pickle) | zero padding to 8 bytes
+    rates: native int64[rooms][days][meal plans][1A, 2A, EA, EC]
+    units available: native int64[rooms][days]
+    rate types: uint8, one per rate
+
+Rates are stored as integers scaled by 10**scale. Each rate's type byte
+records whether it was an int, a float or a Decimal (and its number of
+decimal places), so it reads back exactly as the database returned it and
+serializes to the same JSON. Snapshots are written to
+a temporary file and atomically renamed over ``current.snap``; readers notice
+the new file and remap it, so they are never left with a partial snapshot.
+
+Write one periodically from a single process per host, e.g.:
+
+    python -m rate_snapshot /var/lib/hotel_search/snapshots --days 180 --interval 300
+"""
+from array import array
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+FORMAT_VERSION = 3
+MAGIC = b'HSRS'
+SNAPSHOT_NAME = 'current.snap'
+OCCUPANCY_TYPES = ('1A', '2A', 'EA', 'EC')
+
+# Sentinels: no pricing (or inventory) row for the meal plan/date, and a NULL price column
+ABSENT = -2 ** 63
+NULL = -2 ** 63 + 1
+
+# Rate type bytes; a Decimal with n decimal places is TYPE_DECIMAL + n
+TYPE_INT = 0
+TYPE_FLOAT = 1
+TYPE_DECIMAL = 2
+
+# Decimal places kept for float rates
+FLOAT_SCALE = 4
+
+_header = struct.Struct('<4sHHI')
+
+def _type_of(value: Any) -> int:
+    if isinstance(value, Decimal):
+        return TYPE_DECIMAL + max(0, -value.as_tuple().exponent)
+    if isinstance(value, float):
+        return TYPE_FLOAT
+    return TYPE_INT
+
+def _scale(hotels: List[Dict[str, Any]]) -> int:
+    """Decimal places needed to store every price as a scaled integer."""
+    scale = 0
+    for hotel in hotels:
+        for room in hotel['rooms']:
+            for date_pricing in room['pricing'].values():
+                for occupancy_type in OCCUPANCY_TYPES:
+                    for value in date_pricing[occupancy_type].values():
+                        value_type = _type_of(value)
+                        if value_type == TYPE_FLOAT:
+                            scale = max(scale, FLOAT_SCALE)
+                        elif value_type > TYPE_FLOAT:
+                            scale = max(scale, value_type - TYPE_DECIMAL)
+    return scale
+
+def write_snapshot(directory: str, hotels: List[Dict[str, Any]], start: date, days: int,
+                   meal_plans: List[str], distributor_id: Optional[str] = None) -> str:
+    """Write hotels (as returned by get_hotels_structured for [start, start + days)) as the current snapshot."""
+    os.makedirs(directory, exist_ok=True)
+    scale = _scale(hotels)
+    factor = 10 ** scale
+    meal_plan_index = {name: i for i, name in enumerate(meal_plans)}
+
+    hotel_meta = []
+    rooms = []
+    for hotel in hotels:
+        meta = {k: v for k, v in hotel.items() if k != 'rooms'}
+        meta['rooms'] = []
+        for room in hotel['rooms']:
+            room_meta = {k: v for k, v in room.items() if k not in ('pricing', 'availability', 'rate_version')}
+            room_meta['slot'] = len(rooms)
+            meta['rooms'].append(room_meta)
+            rooms.append(room)
+        hotel_meta.append(meta)
+
+    generation = time.time_ns()
+    metadata = pickle.dumps({
+        'generation': generation,
+        'created_at': time.time(),
+        'start': start,
+        'days': days,
+        'meal_plans': list(meal_plans),
+        'distributor_id': distributor_id,
+        'scale': scale,
+        'room_count': len(rooms),
+        'hotels': hotel_meta
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    stride = len(meal_plans) * len(OCCUPANCY_TYPES)
+    rates = [ABSENT] * (len(rooms) * days * stride)
+    rate_types = bytearray(len(rates))
+    for slot, room in enumerate(rooms):
+        for night, date_pricing in room['pricing'].items():
+            day = (night - start).days
+            if not 0 <= day < days:
+                continue
+            base = (slot * days + day) * stride
+            for occupancy, occupancy_type in enumerate(OCCUPANCY_TYPES):
+                for meal_plan, value in date_pricing[occupancy_type].items():
+                    if meal_plan not in meal_plan_index:
+                        continue
+                    index = base + meal_plan_index[meal_plan] * len(OCCUPANCY_TYPES) + occupancy
+                    rates[index] = NULL if value is None else int(round(value * factor))
+                    rate_types[index] = _type_of(value)
+
+    units = [ABSENT] * (len(rooms) * days)
+    for slot, room in enumerate(rooms):
+        for night, available in room.get('availability', {}).items():
+            day = (night - start).days
+            if 0 <= day < days:
+                units[slot * days + day] = available
+
+    header = _header.pack(MAGIC, FORMAT_VERSION, 0, len(metadata))
+    padding = b'\0' * (-(len(header) + len(metadata)) % 8)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(metadata)
+            f.write(padding)
+            f.write(array('q', rates).tobytes())
+            f.write(array('q', units).tobytes())
+            f.write(rate_types)
+            f.flush()
+            os.fsync(f.fileno())
+        path = os.path.join(directory, SNAPSHOT_NAME)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+class RateSnapshot:
+    """A memory-mapped snapshot that answers get_hotels_structured-style queries."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _header.size:
+            raise ValueError(f"{path} is not a rate snapshot")
+        magic, version, _, metadata_length = _header.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a rate snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported rate snapshot format {version} in {path}")
+        metadata = pickle.loads(self._mmap[_header.size:_header.size + metadata_length])
+        offset = _header.size + metadata_length
+        offset += -offset % 8
+        rate_count = metadata['room_count'] * metadata['days'] * len(metadata['meal_plans']) * len(OCCUPANCY_TYPES)
+        unit_count = metadata['room_count'] * metadata['days']
+        types_offset = offset + (rate_count + unit_count) * 8
+        values = memoryview(self._mmap)[offset:types_offset].cast('q')
+        self._rates = values[:rate_count]
+        self._units = values[rate_count:]
+        self._types = memoryview(self._mmap)[types_offset:types_offset + rate_count]
+
+        self.path = path
+        self.generation = metadata['generation']
+        self.created_at = metadata['created_at']
+        self.start = metadata['start']
+        self.days = metadata['days']
+        self.meal_plans = metadata['meal_plans']
+        self.distributor_id = metadata['distributor_id']
+        self.hotels = metadata['hotels']
+        self._scale = metadata['scale']
+        self._factor = 10 ** self._scale
+        self._stride = len(self.meal_plans) * len(OCCUPANCY_TYPES)
+
+    def age(self) -> float:
+        """Seconds since the snapshot was written."""
+        return time.time() - self.created_at
+
+    def as_of(self) -> str:
+        return datetime.fromtimestamp(self.created_at).isoformat(timespec='seconds')
+
+    def _value(self, index: int) -> Any:
+        raw = self._rates[index]
+        if raw == NULL:
+            return None
+        value_type = self._types[index]
+        if value_type == TYPE_FLOAT:
+            return raw / self._factor
+        if value_type == TYPE_INT:
+            return raw // self._factor
+        places = value_type - TYPE_DECIMAL
+        return Decimal(raw // 10 ** (self._scale - places)).scaleb(-places)
+
+    def covers(self, check_in: Optional[str], check_out: Optional[str],
+               distributor_id: Optional[str] = None) -> bool:
+        """True when every night of the stay is inside the snapshot's calendar."""
+        if not check_in or not check_out or str(distributor_id or '') != str(self.distributor_id or ''):
+            return False
+        first = datetime.strptime(check_in, '%Y-%m-%d').date()
+        last_night = datetime.strptime(check_out, '%Y-%m-%d').date() - timedelta(days=1)
+        return self.start <= first <= last_night < self.start + timedelta(days=self.days)
+
+    def room_pricing(self, slot: int, first: date, last: date) -> Dict[date, Dict[str, Dict[str, Any]]]:
+        """Pricing dict for one room over [first, last], in get_hotels_structured form."""
+        pricing = {}
+        per_meal_plan = len(OCCUPANCY_TYPES)
+        first_day = max(0, (first - self.start).days)
+        last_day = min(self.days - 1, (last - self.start).days)
+        for day in range(first_day, last_day + 1):
+            base = (slot * self.days + day) * self._stride
+            date_pricing = None
+            for m, meal_plan in enumerate(self.meal_plans):
+                offset = base + m * per_meal_plan
+                if self._rates[offset] == ABSENT:
+                    continue
+                if date_pricing is None:
+                    date_pricing = {'1A': {}, '2A': {}, 'EA': {}, 'EC': {}}
+                for o, occupancy_type in enumerate(OCCUPANCY_TYPES):
+                    date_pricing[occupancy_type][meal_plan] = self._value(offset + o)
+            if date_pricing is not None:
+                pricing[self.start + timedelta(days=day)] = date_pricing
+        return pricing
+
+    def room_availability(self, slot: int, first: date, last: date) -> Dict[date, int]:
+        """Units available per date for one room over [first, last]."""
+        availability = {}
+        first_day = max(0, (first - self.start).days)
+        last_day = min(self.days - 1, (last - self.start).days)
+        for day in range(first_day, last_day + 1):
+            units = self._units[slot * self.days + day]
+            if units != ABSENT:
+                availability[self.start + timedelta(days=day)] = units
+        return availability
+
+    def get_hotels(self, city_id: Optional[str] = None, hotel_id: Optional[str] = None,
+                   brand_id: Optional[str] = None, check_in: Optional[str] = None,
+                   check_out: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Hotels matching the filters with pricing between check_in and check_out (inclusive)."""
+        first = datetime.strptime(check_in, '%Y-%m-%d').date()
+        last = datetime.strptime(check_out, '%Y-%m-%d').date()
+        hotels = []
+        for meta in self.hotels:
+            if city_id and str(meta['city_id']) != str(city_id):
+                continue
+            if hotel_id and str(meta['hotel_id']) != str(hotel_id):
+                continue
+            if brand_id and str(meta['brand_id']) != str(brand_id):
+                continue
+            rooms = []
+            for room_meta in meta['rooms']:
+                pricing = self.room_pricing(room_meta['slot'], first, last)
+                # Like the SQL JOIN, rooms without any rates in the window are dropped
+                if not pricing:
+                    continue
+                room = {k: v for k, v in room_meta.items() if k != 'slot'}
+                room['pricing'] = pricing
+                room['availability'] = self.room_availability(room_meta['slot'], first, last)
+                room['rate_version'] = ('snapshot', self.generation)
+                rooms.append(room)
+            if rooms:
+                hotel = {k: v for k, v in meta.items() if k != 'rooms'}
+                hotel['rooms'] = rooms
+                hotels.append(hotel)
+        return hotels
+
+class SnapshotReader:
+    """Keeps the current snapshot of a directory mapped, remapping when it is replaced."""
+
+    # Seconds between checks for a newer snapshot file
+    check_interval = 1.0
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._path = os.path.join(directory, SNAPSHOT_NAME)
+        self._snapshot = None
+        self._stat_key = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[RateSnapshot]:
+        """The latest snapshot, or None when there is none (or it is unreadable)."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self._path)
+            except FileNotFoundError:
+                return self._snapshot
+            stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stat_key != self._stat_key:
+                try:
+                    self._snapshot = RateSnapshot(self._path)
+                    self._stat_key = stat_key
+                except (OSError, ValueError, pickle.UnpicklingError) as e:
+                    print(f"Rate snapshot error: {str(e)}")
+            return self._snapshot
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description='Write rate snapshots from the database.')
+    parser.add_argument('directory')
+    parser.add_argument('--days', type=int, default=180, help='days of rates from today to include')
+    parser.add_argument('--distributor-id')
+    parser.add_argument('--interval', type=float, help='keep refreshing every this many seconds')
+    args = parser.parse_args(argv)
+
+    # Imported here so workers that only read snapshots do not need the database layer
+    from functions import refresh_rate_snapshot
+    if not args.interval:
+        path = refresh_rate_snapshot(args.directory, args.days, args.distributor_id)
+        print(f"Wrote {path}")
+        return
+    while True:
+        started = time.perf_counter()
+        try:
+            path = refresh_rate_snapshot(args.directory, args.days, args.distributor_id)
+            print(f"Wrote {path} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            # Keep the previous snapshot and retry on the next tick
+            print(f"Rate snapshot refresh failed: {str(e)}")
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
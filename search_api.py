@@ -1,9 +1,17 @@
-from flask import Flask, request, jsonify
-from datetime import datetime
-from flask_cors import CORS
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request
+import hmac
 import logging
+import os
+import time
+from typing import Any, Dict, Optional
+import db_config
+import functions
+import metrics
+from admission import AdmissionController, Overloaded, SearchBudgetExceeded, deadline_after
+from validation import ValidationError, limits_from_env, validate_calendar, validate_search
 from functions import (
     get_hotels_structured,
+    get_price_calendar,
     search_hotels,
     split_children_into_rooms,
     split_adults_into_rooms
@@ -13,25 +21,191 @@ from functions import (
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+bp = Blueprint('search', __name__)
+
+def load_config() -> Dict[str, Any]:
+    """Application settings from the environment."""
+    return {
+        # Add a Server-Timing header with per-stage durations to search responses
+        'SERVER_TIMING': os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes'),
+
+        # On-demand profiling: disabled unless a token is configured. Profiles are written
+        # to PROFILE_DIR when set, otherwise returned in the response under 'profile'.
+        'PROFILE_TOKEN': os.environ.get('PROFILE_TOKEN', ''),
+        'PROFILE_DIR': os.environ.get('PROFILE_DIR', ''),
+
+        # Request limits (see validation.DEFAULT_LIMITS) and the time budget for pricing one search
+        'SEARCH_LIMITS': limits_from_env(),
+        'SEARCH_TIME_BUDGET': float(os.environ.get('SEARCH_TIME_BUDGET', 10)),
+
+        # Searches run concurrently per worker; further requests wait in a bounded queue
+        # and are shed with 429 when it is full or they wait too long
+        'MAX_CONCURRENT_SEARCHES': int(os.environ.get('MAX_CONCURRENT_SEARCHES', 8)),
+        'SEARCH_QUEUE_SIZE': int(os.environ.get('SEARCH_QUEUE_SIZE', 16)),
+        'SEARCH_QUEUE_TIMEOUT': float(os.environ.get('SEARCH_QUEUE_TIMEOUT', 2))
+    }
+
+# Settings that are handed to functions.configure_inventory when given to create_app
+INVENTORY_SETTINGS = ('INVENTORY_CACHE_URL', 'INVENTORY_CACHE_TTL', 'RATE_SNAPSHOT_DIR', 'RATE_SNAPSHOT_MAX_AGE')
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """Create the search application.
+
+    Settings come from the environment (see load_config), overridden by config.
+    DATABASE_URL and the inventory settings in config reconfigure the database
+    and inventory tiers; nothing connects to the database until the first search.
+    """
+    app = Flask(__name__)
+    app.config.update(load_config())
+    app.config.update(config or {})
+
+    if app.config.get('DATABASE_URL'):
+        db_config.configure(url=app.config['DATABASE_URL'])
+    if not db_config.is_configured():
+        logger.warning("No database configured: set DATABASE_URL or DB_HOST, DB_USERNAME, "
+                       "DB_PASSWORD and DB_NAME; searches will fail until one is set")
+    if any(name in (config or {}) for name in INVENTORY_SETTINGS):
+        functions.configure_inventory(
+            app.config.get('INVENTORY_CACHE_URL', ''),
+            int(app.config.get('INVENTORY_CACHE_TTL', functions.inventory_cache.DEFAULT_TTL)),
+            app.config.get('RATE_SNAPSHOT_DIR', ''),
+            int(app.config.get('RATE_SNAPSHOT_MAX_AGE', 300))
+        )
+
+    app.extensions['search_admission'] = AdmissionController(
+        app.config['MAX_CONCURRENT_SEARCHES'],
+        app.config['SEARCH_QUEUE_SIZE'],
+        app.config['SEARCH_QUEUE_TIMEOUT']
+    )
+    app.register_blueprint(bp)
+    return app
 
 # Add CORS headers to all responses
-@app.after_request
+@bp.after_app_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
     response.headers.add('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
+    if 'search_start' in g:
+        metrics.observe_duration('total', time.perf_counter() - g.search_start)
+        if current_app.config['SERVER_TIMING']:
+            response.headers['Server-Timing'] = metrics.server_timing_header(metrics.request_timings())
     return response
 
-@app.route('/api/search', methods=['POST', 'GET', 'OPTIONS'])
+@bp.teardown_app_request
+def end_request_timings(error=None):
+    metrics.end_request()
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def profile_requested() -> bool:
+    """True when the request opts into profiling with the configured token."""
+    token = current_app.config['PROFILE_TOKEN']
+    if not token:
+        return False
+    supplied = request.headers.get('X-Profile') or request.args.get('profile')
+    if not supplied:
+        return False
+    # Compare bytes: compare_digest rejects non-ASCII str arguments
+    return hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+@bp.route('/api/search', methods=['POST', 'GET', 'OPTIONS'])
 def search():
-    logger.debug(f"Request Method: {request.method}")
-    logger.debug(f"Request Headers: {dict(request.headers)}")
-    
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
         return '', 200
 
+    # Start the request's timings before queueing so the admission wait is included
+    g.search_start = time.perf_counter()
+    metrics.start_request()
+    try:
+        with current_app.extensions['search_admission'].slot():
+            metrics.observe_duration('admission', time.perf_counter() - g.search_start)
+            return admitted_search()
+    except Overloaded as e:
+        logger.warning(f"Shedding search request: {str(e)}")
+        response = jsonify({
+            'error': True,
+            'message': 'Too many searches in progress, please retry shortly'
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 429
+
+@bp.route('/api/calendar', methods=['GET', 'POST', 'OPTIONS'])
+def calendar():
+    """Lowest price per night for one hotel, by room type and meal plan."""
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    data = request.get_json(silent=True) if request.is_json else request.values
+    try:
+        if not hasattr(data, 'get'):
+            raise ValidationError('Request body must be a JSON object')
+        params = validate_calendar(data, current_app.config['SEARCH_LIMITS'])
+    except ValidationError as e:
+        error_response = {
+            'error': True,
+            'message': str(e)
+        }
+        logger.error(f"Validation Error: {error_response}")
+        return jsonify(error_response), 400
+
+    try:
+        with current_app.extensions['search_admission'].slot():
+            result = get_price_calendar(params['hotel_id'], params['start'], params['end'])
+    except Overloaded as e:
+        logger.warning(f"Shedding calendar request: {str(e)}")
+        response = jsonify({
+            'error': True,
+            'message': 'Too many searches in progress, please retry shortly'
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 429
+
+    if result is None:
+        return jsonify({
+            'error': False,
+            'data': {
+                'calendar': None,
+                'message': 'No rates found for this hotel and dates'
+            }
+        })
+    return jsonify({
+        'error': False,
+        'data': {
+            'calendar': result
+        }
+    })
+
+def admitted_search():
+    if not profile_requested():
+        return run_search()
+
+    # Imported lazily so requests that do not opt in pay nothing
+    import profiling
+    result, profiler = profiling.profile_call(run_search)
+    response = current_app.make_response(result)
+    profile_dir = current_app.config['PROFILE_DIR']
+    if profile_dir:
+        name = profiling.save_profile(profiler, profile_dir)
+        response.headers['X-Profile-Id'] = name
+        logger.info(f"Saved search profile {name} to {profile_dir}")
+    elif response.is_json:
+        body = response.get_json()
+        body['profile'] = profiling.stats_text(profiler)
+        response.set_data(jsonify(body).get_data())
+    return response
+
+def run_search():
+    logger.debug(f"Request Method: {request.method}")
+    # The profiling token is a secret and must not reach the logs
+    headers = {name: value for name, value in request.headers.items() if name.lower() != 'x-profile'}
+    logger.debug(f"Request Headers: {headers}")
+
+    parse_start = time.perf_counter()
+
     # Get request data
     if request.is_json:
         data = request.get_json()
@@ -40,16 +214,28 @@ def search():
         data = request.form
         logger.debug(f"Form Data: {data}")
 
-    # Extract parameters with defaults
-    city_id = data.get('city_id', '')
-    hotel_id = data.get('hotel_id', '')
-    brand_id = data.get('brand_id', '')
-    check_in = data.get('checkIn', datetime.now().strftime('%Y-%m-%d'))
-    check_out = data.get('checkOut', (datetime.now().strftime('%Y-%m-%d')))
-    adults = int(data.get('adults', 1))
-    rooms = int(data.get('rooms', 1))
-    children = int(data.get('children', 0))
-    children_ages = []
+    # Validate and extract parameters with defaults
+    try:
+        if not isinstance(data, dict):
+            raise ValidationError('Request body must be a JSON object')
+        params = validate_search(data, current_app.config['SEARCH_LIMITS'])
+    except ValidationError as e:
+        error_response = {
+            'error': True,
+            'message': str(e)
+        }
+        logger.error(f"Validation Error: {error_response}")
+        return jsonify(error_response), 400
+
+    city_id = params['city_id']
+    hotel_id = params['hotel_id']
+    brand_id = params['brand_id']
+    check_in = params['check_in']
+    check_out = params['check_out']
+    adults = params['adults']
+    rooms = params['rooms']
+    children = params['children']
+    children_ages = params['children_ages']
 
     logger.debug(f"Extracted Parameters:")
     logger.debug(f"City ID: {city_id}")
@@ -60,32 +246,14 @@ def search():
     logger.debug(f"Adults: {adults}")
     logger.debug(f"Rooms: {rooms}")
     logger.debug(f"Children: {children}")
+    logger.debug(f"Children Ages: {children_ages}")
 
-    # Process children ages
-    if 'childrenAges' in data and isinstance(data['childrenAges'], list):
-        children_ages = [int(age) for age in data['childrenAges'] if age is not None and age != '']
-        logger.debug(f"Children Ages: {children_ages}")
-
-    # Validate required parameters - either city or hotel must be provided
-    if not city_id and not hotel_id and not brand_id:
-        error_response = {
-            'error': True,
-            'message': 'Either city or hotel or brand must be provided'
-        }
-        logger.error(f"Validation Error: {error_response}")
-        return jsonify(error_response), 400
-
-    if not check_in or not check_out:
-        error_response = {
-            'error': True,
-            'message': 'Check-in and check-out dates are required'
-        }
-        logger.error(f"Validation Error: {error_response}")
-        return jsonify(error_response), 400
+    metrics.observe_duration('parse', time.perf_counter() - parse_start)
 
     # Fetch hotels from DB
     logger.debug("Fetching hotels from database...")
-    hotels = get_hotels_structured(city_id, hotel_id, brand_id, check_in, check_out)
+    with metrics.span('inventory'):
+        hotels = get_hotels_structured(city_id, hotel_id, brand_id, check_in, check_out)
     logger.debug(f"Found {len(hotels)} hotels")
 
     if not hotels:
@@ -98,6 +266,11 @@ def search():
         }
         return jsonify(response)
 
+    allocation_start = time.perf_counter()
+
+    # Rates served from an old snapshot while the database is unavailable
+    stale_hotel = next((hotel for hotel in hotels if hotel.get('rates_stale')), None)
+
     # Calculate minimum rooms needed
     max_adults_per_room = 0
     max_children_per_room = 0
@@ -161,9 +334,21 @@ def search():
                 'children': children_per_room[i]
             })
 
+    metrics.observe_duration('allocation', time.perf_counter() - allocation_start)
+
     # Perform search
     logger.debug("Performing hotel search...")
-    search_results = search_hotels(hotels, city_id, hotel_id, brand_id, adults, children_ages, check_in, check_out, rooms_to_allocate)
+    try:
+        with metrics.span('search'):
+            search_results = search_hotels(hotels, city_id, hotel_id, brand_id, adults, children_ages, check_in, check_out, rooms_to_allocate,
+                                           deadline=deadline_after(current_app.config['SEARCH_TIME_BUDGET']))
+    except SearchBudgetExceeded as e:
+        error_response = {
+            'error': True,
+            'message': 'Search took too long, please narrow the search'
+        }
+        logger.error(f"Search aborted: {str(e)}")
+        return jsonify(error_response), 503
     logger.debug(f"Found {len(search_results)} search results")
 
     # Prepare response
@@ -174,6 +359,7 @@ def search():
             'autoRoomMessage': auto_room_message,
             'allocation': allocation,
             'valid': valid,
+            'stale': stale_hotel is not None,
             'searchParams': {
                 'city_id': city_id,
                 'hotel_id': hotel_id,
@@ -193,8 +379,14 @@ def search():
         }
     }
 
+    if stale_hotel:
+        response['data']['ratesAsOf'] = stale_hotel['rates_as_of']
+
     logger.debug("Sending response...")
-    return jsonify(response)
+    with metrics.span('serialize'):
+        return jsonify(response)
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000) 
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""Single-flight coalescing of concurrent identical loads.
+
+Concurrent callers asking for the same key wait on one in-flight call and
+share its result (or its exception) instead of each running the load.
+"""
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised when a waiter gives up on an in-flight call."""
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing a key across threads and asyncio tasks."""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, Any] = {}
+        self._lock = Lock()
+        self.loads = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Return fn(), sharing one execution among concurrent callers with the same key.
+
+        Waiters raise SingleFlightTimeout after timeout seconds (default: the
+        instance timeout); the leader always runs fn to completion.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.loads += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(self.timeout if timeout is None else timeout):
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight call {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Async variant of do for tasks on one event loop.
+
+        fn may be a coroutine function or a blocking function, which is run
+        in the loop's default executor.
+        """
+        # Imported here so thread-only callers do not pay for asyncio
+        import asyncio
+        import inspect
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._async_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[key] = loop.create_future()
+                self.loads += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn()
+                else:
+                    result = await loop.run_in_executor(None, fn)
+                future.set_result(result)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._async_calls[key]
+
+        try:
+            # shield so a timed-out waiter does not cancel the shared call
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight call {key!r}")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader loads as misses and coalesced waiters as hits."""
+        return {
+            'hits': self.coalesced,
+            'misses': self.loads,
+            'size': self.in_flight()
+        }
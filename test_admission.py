@@ -0,0 +1,69 @@
+"""Tests for admission control and search time budgets."""
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, Overloaded, SearchBudgetExceeded, check_deadline, deadline_after
+
+def _hold_slot(controller):
+    """Occupy one slot from another thread until the returned event is set."""
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with controller.slot():
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    entered.wait(5)
+    return release, thread
+
+def test_admits_up_to_max_concurrent():
+    controller = AdmissionController(2, 0, 0.01)
+    with controller.slot():
+        with controller.slot():
+            assert controller.stats()['active'] == 2
+    assert controller.stats() == {'active': 0, 'waiting': 0, 'admitted': 2, 'shed': 0}
+
+def test_sheds_when_queue_is_full():
+    controller = AdmissionController(1, 0, 5)
+    release, thread = _hold_slot(controller)
+    started = time.monotonic()
+    with pytest.raises(Overloaded, match='queue is full'):
+        with controller.slot():
+            pass
+    # Shed immediately rather than after the queue timeout
+    assert time.monotonic() - started < 1
+    release.set()
+    thread.join(5)
+    assert controller.stats()['shed'] == 1
+
+def test_sheds_after_waiting_too_long():
+    controller = AdmissionController(1, 1, 0.05)
+    release, thread = _hold_slot(controller)
+    with pytest.raises(Overloaded, match='Timed out'):
+        with controller.slot():
+            pass
+    release.set()
+    thread.join(5)
+    assert controller.stats() == {'active': 0, 'waiting': 0, 'admitted': 1, 'shed': 1}
+    # The freed slot is available again
+    with controller.slot():
+        pass
+
+def test_queued_request_gets_a_freed_slot():
+    controller = AdmissionController(1, 1, 5)
+    release, thread = _hold_slot(controller)
+    threading.Timer(0.05, release.set).start()
+    with controller.slot():
+        assert controller.stats()['active'] == 1
+    thread.join(5)
+
+def test_deadlines():
+    assert deadline_after(0) == float('inf')
+    check_deadline(deadline_after(60))
+    with pytest.raises(SearchBudgetExceeded):
+        check_deadline(time.monotonic() - 1)
@@ -0,0 +1,33 @@
+"""Tests for the bounded LRU cache."""
+import functions
+import metrics
+from cache import LRUCache
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['size'] == 2
+
+def test_clear_keeps_counters_monotonic():
+    cache = LRUCache()
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_invalidation_does_not_reset_exported_counters():
+    before = metrics.cache_stats()['stay_prices']
+    functions._stay_price_cache.get(('missing',))
+    functions.invalidate_inventory_cache()
+    after = metrics.cache_stats()['stay_prices']
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] >= before['hits']
+    assert after['size'] == 0
@@ -0,0 +1,52 @@
+"""Tests for party splits, room pricing and inventory pruning in functions.py."""
+from datetime import date
+
+from functions import (
+    MEAL_PLAN_MAP,
+    balanced_split,
+    most_balanced_split,
+    room_available_units,
+    search_hotels,
+    split_guests
+)
+
+def test_balanced_split_matches_enumeration():
+    for n in range(13):
+        for k in range(1, 7):
+            for m in range(1, 6):
+                expected = tuple(most_balanced_split(split_guests(n, k, m)))
+                assert balanced_split(n, k, m) == expected, (n, k, m)
+
+def _room(room_id, availability):
+    prices = {'1A': 3000, '2A': 3500, 'EA': 800, 'EC': 500}
+    return {
+        'room_id': room_id, 'dist_room_id': 100 + room_id, 'room_name': f'Room {room_id}', 'room_type': 'Double',
+        'max_adults': 2, 'max_children': 1, 'max_occupancy': 3, 'free_child_age': 5,
+        'pricing': {night: {occupancy: {meal_plan: price for meal_plan in MEAL_PLAN_MAP.values()}
+                            for occupancy, price in prices.items()}
+                    for night in (date(2025, 1, 2), date(2025, 1, 3))},
+        'availability': availability, 'rate_version': room_id
+    }
+
+def test_search_prunes_sold_out_rooms():
+    first, second, check_out = date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 4)
+    hotel = {
+        'hotel_id': 1, 'dist_hotel_id': 1, 'hotel_name': 'Hotel', 'city_id': 1, 'brand_id': 1,
+        'rooms': [
+            _room(1, {first: 3, second: 1}),                # one night short of the 2 rooms needed
+            _room(2, {}),                                   # no inventory rows: unlimited
+            _room(3, {first: 5}),                           # second night has no row: unlimited
+            _room(4, {first: 2, second: 2}),                # exactly enough
+            _room(5, {first: 4, second: 3, check_out: 0}),  # check-out day is not a night of the stay
+        ]
+    }
+    [result] = search_hotels([hotel], '', '', '', 4, [], '2025-01-02', '2025-01-04', 2)
+    units = {room['room_id']: room['available_units'] for room in result['rooms']}
+    assert units == {2: None, 3: 5, 4: 2, 5: 3}
+
+def test_room_available_units():
+    nights = (date(2025, 1, 2), date(2025, 1, 3))
+    assert room_available_units({'availability': {}}, nights) is None
+    assert room_available_units({}, nights) is None
+    assert room_available_units({'availability': {date(2025, 1, 9): 0}}, nights) is None
+    assert room_available_units({'availability': {nights[0]: 4, nights[1]: 1}}, nights) == 1
@@ -0,0 +1,140 @@
+"""Tests for single-flight coalescing of concurrent loads."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, SingleFlightTimeout
+
+def _start_waiters(flight, key, count, results, errors, timeout=None):
+    def wait():
+        try:
+            results.append(flight.do(key, lambda: 'waiter ran', timeout=timeout))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=wait) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def _wait_for_waiters(flight, count):
+    deadline = time.monotonic() + 5
+    while flight.coalesced < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    calls = []
+    results = []
+    errors = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return 'rows'
+
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', load)))
+    leader.start()
+    while not calls:
+        time.sleep(0.001)
+    waiters = _start_waiters(flight, 'key', 4, results, errors)
+    _wait_for_waiters(flight, 4)
+    release.set()
+    for thread in [leader] + waiters:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ['rows'] * 5
+    assert errors == []
+    assert flight.stats() == {'hits': 4, 'misses': 1, 'size': 0}
+
+def test_single_flight_waiter_times_out():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        return 'rows'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', load)))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do('key', lambda: 'waiter ran', timeout=0.01)
+    release.set()
+    leader.join(5)
+
+    # The leader is unaffected by the waiter giving up
+    assert results == ['rows']
+    assert flight.in_flight() == 0
+
+def test_single_flight_error_reaches_waiters():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('database down')
+
+    leader_errors = []
+    def lead():
+        try:
+            flight.do('key', load)
+        except RuntimeError as e:
+            leader_errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(5)
+    results = []
+    errors = []
+    waiters = _start_waiters(flight, 'key', 3, results, errors)
+    _wait_for_waiters(flight, 3)
+    release.set()
+    for thread in [leader] + waiters:
+        thread.join(5)
+
+    assert results == []
+    assert len(leader_errors) == 1
+    assert [str(e) for e in errors] == ['database down'] * 3
+    # A failed call is not remembered
+    assert flight.do('key', lambda: 'retried') == 'retried'
+
+def test_single_flight_async_shares_one_call():
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'rows'
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async('key', load) for _ in range(5)))
+
+    assert asyncio.run(main()) == ['rows'] * 5
+    assert calls == [1]
+    assert flight.in_flight() == 0
+
+def test_single_flight_async_waiter_times_out():
+    flight = SingleFlight(timeout=5)
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return 'rows'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async('key', load))
+        await asyncio.sleep(0)
+        with pytest.raises(SingleFlightTimeout):
+            await flight.do_async('key', load, timeout=0.001)
+        return await leader
+
+    assert asyncio.run(main()) == 'rows'
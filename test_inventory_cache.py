@@ -0,0 +1,72 @@
+"""Tests for the shared inventory cache on the file backend."""
+import os
+import time
+
+import pytest
+
+import inventory_cache
+from inventory_cache import FileBackend, SharedInventoryCache
+
+HOTELS = [{'hotel_id': 1, 'rooms': []}]
+
+@pytest.fixture
+def backend(tmp_path):
+    return FileBackend(str(tmp_path))
+
+def _later(monkeypatch, seconds):
+    now = time.time()
+    monkeypatch.setattr(inventory_cache.time, 'time', lambda: now + seconds)
+
+def test_file_backend_set_and_get(backend):
+    assert backend.get('missing') is None
+    backend.set('key', b'value', 60)
+    assert backend.get('key') == b'value'
+    # No temporary files are left behind
+    assert not [name for name in os.listdir(backend.directory) if name.startswith('.tmp-')]
+
+def test_file_backend_expiry(backend, monkeypatch):
+    backend.set('short', b'value', 10)
+    backend.set('forever', b'value', 0)
+    _later(monkeypatch, 11)
+    assert backend.get('short') is None
+    assert backend.get('forever') == b'value'
+
+def test_file_backend_sweep(backend, monkeypatch):
+    backend.set('short', b'value', 10)
+    backend.set('long', b'value', 100)
+    backend.set('forever', b'value', 0)
+    _later(monkeypatch, 11)
+    assert backend.sweep() == 1
+    assert len(os.listdir(backend.directory)) == 2
+    assert backend.get('long') == b'value'
+
+def test_file_backend_incr(backend):
+    assert [backend.incr('counter') for _ in range(3)] == [1, 2, 3]
+
+def test_invalidate_switches_generation(backend):
+    cache = SharedInventoryCache(backend, ttl=60)
+    cache.set('key', HOTELS)
+    assert cache.get('key') == HOTELS
+    assert cache.invalidate() == 1
+    assert cache.get('key') is None
+    # Another worker sharing the directory sees the same generation
+    other = SharedInventoryCache(FileBackend(backend.directory), ttl=60)
+    other.set('key', HOTELS)
+    assert cache.get('key') == HOTELS
+
+def test_unreadable_value_counts_as_miss(backend):
+    cache = SharedInventoryCache(backend, ttl=60)
+    cache.set('key', HOTELS)
+    path = backend._path(cache._key('key'))
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 4)
+    assert cache.get('key') is None
+    # A value written by another tool
+    backend.set(cache._key('other'), b'not a pickle', 60)
+    assert cache.get('other') is None
+    assert cache.stats() == {'hits': 0, 'misses': 2, 'errors': 2}
+
+def test_from_url():
+    assert inventory_cache.from_url('') is None
+    with pytest.raises(ValueError):
+        inventory_cache.from_url('ftp://example.com/cache')
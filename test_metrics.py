@@ -0,0 +1,29 @@
+"""Tests for per-request stage timings and the Server-Timing header."""
+import metrics
+from conftest import SEARCH
+
+def _stages(response):
+    return [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+
+def test_server_timing_holds_only_the_requests_own_stages(make_app):
+    client = make_app(SERVER_TIMING=True).test_client()
+
+    first = _stages(client.post('/api/search', json=SEARCH))
+    assert first[0] == 'admission' and first[-1] == 'total'
+    assert first.count('total') == 1
+
+    # Work between searches on the same thread is not added to any request
+    for _ in range(5):
+        client.get('/api/calendar', query_string={'hotel_id': 1, 'start': '2025-01-01', 'end': '2025-01-08'})
+    assert metrics.request_timings() == []
+
+    second = _stages(client.post('/api/search', json=dict(SEARCH, checkOut='2025-01-05')))
+    assert second.count('admission') == 1 and second.count('total') == 1
+    assert 'calendar' not in second
+
+def test_spans_outside_a_request_are_not_collected():
+    metrics.start_request()
+    metrics.end_request()
+    with metrics.span('sql'):
+        pass
+    assert metrics.request_timings() == []
@@ -0,0 +1,59 @@
+"""Tests for incrementally extended price calendars."""
+from datetime import date
+
+from price_calendar import PriceCalendar, add_range, missing_ranges
+
+def _d(day):
+    return date(2025, 1, day)
+
+def test_missing_ranges():
+    covered = [(_d(1), _d(5)), (_d(8), _d(9))]
+    assert missing_ranges([], _d(1), _d(8)) == [(_d(1), _d(8))]
+    assert missing_ranges(covered, _d(2), _d(4)) == []
+    assert missing_ranges(covered, _d(3), _d(12)) == [(_d(5), _d(8)), (_d(9), _d(12))]
+    # Adjacent windows only need the new nights
+    assert missing_ranges(covered, _d(5), _d(8)) == [(_d(5), _d(8))]
+    assert missing_ranges(covered, _d(9), _d(16)) == [(_d(9), _d(16))]
+    assert missing_ranges(covered, _d(10), _d(12)) == [(_d(10), _d(12))]
+
+def test_add_range():
+    assert add_range([], _d(1), _d(5)) == [(_d(1), _d(5))]
+    # Adjacent ranges merge
+    assert add_range([(_d(1), _d(5))], _d(5), _d(12)) == [(_d(1), _d(12))]
+    assert add_range([(_d(8), _d(12))], _d(1), _d(8)) == [(_d(1), _d(12))]
+    # Overlapping ranges merge, including ones bridging two covered ranges
+    assert add_range([(_d(1), _d(5)), (_d(8), _d(9))], _d(4), _d(8)) == [(_d(1), _d(9))]
+    assert add_range([(_d(1), _d(10))], _d(3), _d(4)) == [(_d(1), _d(10))]
+    # Disjoint ranges stay separate and sorted
+    assert add_range([(_d(8), _d(9))], _d(1), _d(5)) == [(_d(1), _d(5)), (_d(8), _d(9))]
+
+def test_price_calendar_caches_fresh_gaps_next_to_stale_ones():
+    room = {
+        'room_id': 1,
+        'room_name': 'Deluxe',
+        'room_type': 'Double',
+        'pricing': {_d(day): {'1A': {'Room Only': 100 + day}, '2A': {'Room Only': 200}, 'EA': {}, 'EC': {}}
+                    for day in range(1, 29)},
+        'availability': {}
+    }
+    loads = []
+
+    def loader(hotel_id, check_in, check_out, distributor_id):
+        loads.append((check_in, check_out))
+        hotel = {'hotel_id': 1, 'hotel_name': 'Hotel', 'rooms': [room]}
+        # The database is down for the first week only
+        if check_in < '2025-01-08':
+            hotel.update(rates_stale=True, rates_as_of='2025-01-01T00:00:00')
+        return [hotel]
+
+    calendar = PriceCalendar(loader, lambda: 0)
+    calendar.get(1, _d(8), _d(15))
+    result = calendar.get(1, _d(1), _d(22))
+    assert result['stale'] and result['ratesAsOf'] == '2025-01-01T00:00:00'
+    assert len(result['lowest']) == 21
+    assert loads == [('2025-01-08', '2025-01-15'), ('2025-01-01', '2025-01-08'), ('2025-01-15', '2025-01-22')]
+
+    # Only the stale week is loaded again
+    result = calendar.get(1, _d(1), _d(22))
+    assert loads[3:] == [('2025-01-01', '2025-01-08')]
+    assert result['stale']
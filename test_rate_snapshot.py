@@ -0,0 +1,126 @@
+"""Tests for the memory-mapped rate snapshot."""
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+
+import db_config
+import functions
+import rate_snapshot
+from conftest import SEARCH
+from rate_snapshot import RateSnapshot, SnapshotReader, write_snapshot
+
+START = date(2025, 1, 1)
+MEAL_PLANS = ['Room Only', 'Room with Breakfast']
+
+def _pricing(one, two, extra_adult, extra_child, meal_plan='Room Only'):
+    return {'1A': {meal_plan: one}, '2A': {meal_plan: two}, 'EA': {meal_plan: extra_adult}, 'EC': {meal_plan: extra_child}}
+
+def _hotels():
+    pricing = {
+        # int, Decimal with different decimal places, float and NULL prices
+        START: _pricing(7950, Decimal('8100.00'), Decimal('950.5'), None),
+        START + timedelta(days=1): _pricing(7950.25, 8100, None, 500),
+        # No night on START + 2, and only breakfast on START + 3
+        START + timedelta(days=3): _pricing(Decimal('7000'), Decimal('7500.00'), 900, 400, 'Room with Breakfast'),
+    }
+    room = {
+        'room_id': 11, 'dist_room_id': 21, 'room_name': 'Deluxe', 'room_type': 'Double',
+        'max_adults': 2, 'max_children': 1, 'max_occupancy': 3, 'free_child_age': 5,
+        'pricing': pricing, 'availability': {START: 4, START + timedelta(days=3): 0},
+        'rate_version': 123
+    }
+    return [{'hotel_id': 1, 'dist_hotel_id': 1, 'hotel_name': 'Hotel', 'city_id': 7, 'brand_id': 3, 'rooms': [room]}]
+
+def _typed(pricing):
+    return {night: {occupancy: {meal_plan: (type(value), value) for meal_plan, value in prices.items()}
+                    for occupancy, prices in date_pricing.items()}
+            for night, date_pricing in pricing.items()}
+
+def test_round_trip_keeps_values_and_types(tmp_path):
+    hotels = _hotels()
+    path = write_snapshot(str(tmp_path), hotels, START, 10, MEAL_PLANS)
+    snapshot = RateSnapshot(path)
+
+    [hotel] = snapshot.get_hotels(hotel_id='1', check_in='2025-01-01', check_out='2025-01-10')
+    [room] = hotel['rooms']
+    expected = hotels[0]['rooms'][0]
+    assert _typed(room['pricing']) == _typed(expected['pricing'])
+    as_json = lambda pricing: json.dumps({str(night): prices for night, prices in pricing.items()}, default=str)
+    assert as_json(room['pricing']) == as_json(expected['pricing'])
+    assert room['availability'] == expected['availability']
+    assert room['rate_version'] == ('snapshot', snapshot.generation)
+    assert room['room_name'] == 'Deluxe' and hotel['hotel_name'] == 'Hotel'
+
+def test_get_hotels_filters_and_windows(tmp_path):
+    snapshot = RateSnapshot(write_snapshot(str(tmp_path), _hotels(), START, 10, MEAL_PLANS))
+    assert snapshot.get_hotels(city_id='8', check_in='2025-01-01', check_out='2025-01-05') == []
+    [hotel] = snapshot.get_hotels(brand_id='3', check_in='2025-01-02', check_out='2025-01-03')
+    assert list(hotel['rooms'][0]['pricing']) == [START + timedelta(days=1)]
+    # Like the SQL join, rooms without rates in the window are left out
+    assert snapshot.get_hotels(check_in='2025-01-05', check_out='2025-01-10') == []
+
+def test_covers_window_edges(tmp_path):
+    snapshot = RateSnapshot(write_snapshot(str(tmp_path), _hotels(), START, 10, MEAL_PLANS))
+    assert snapshot.covers('2025-01-01', '2025-01-02')
+    # Check-out is exclusive: the last night is 2025-01-10
+    assert snapshot.covers('2025-01-01', '2025-01-11')
+    assert snapshot.covers('2025-01-10', '2025-01-11')
+    assert not snapshot.covers('2025-01-10', '2025-01-12')
+    assert not snapshot.covers('2024-12-31', '2025-01-02')
+    assert not snapshot.covers('2025-01-03', '2025-01-03')
+    assert not snapshot.covers(None, '2025-01-03')
+    assert not snapshot.covers('2025-01-01', '2025-01-02', distributor_id='5')
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.snap'
+    path.write_bytes(b'not a snapshot at all')
+    with pytest.raises(ValueError):
+        RateSnapshot(str(path))
+
+def test_reader_remaps_replaced_snapshot(tmp_path):
+    reader = SnapshotReader(str(tmp_path))
+    reader.check_interval = 0
+    assert reader.current() is None
+
+    write_snapshot(str(tmp_path), _hotels(), START, 10, MEAL_PLANS)
+    first = reader.current()
+    assert first.days == 10
+    assert reader.current() is first
+
+    write_snapshot(str(tmp_path), _hotels(), START, 20, MEAL_PLANS)
+    second = reader.current()
+    assert second is not first
+    assert second.days == 20 and second.generation != first.generation
+
+    # An unreadable replacement keeps the last good snapshot
+    (tmp_path / rate_snapshot.SNAPSHOT_NAME).write_bytes(b'garbage')
+    assert reader.current() is second
+
+@pytest.fixture
+def stale_snapshot(synthetic_db, tmp_path):
+    """A snapshot of the synthetic inventory that is too old to serve, and a failing database."""
+    hotels = functions._query_hotels_structured(None, None, None, '2025-01-01', '2025-01-30', None)
+    write_snapshot(str(tmp_path), hotels, START, 30, list(functions.MEAL_PLAN_MAP.values()))
+    functions.configure_inventory(snapshot_dir=str(tmp_path), snapshot_max_age=-1)
+    db_config.configure(engine=create_engine('sqlite:////nonexistent/dir/hotels.db'))
+    yield
+    functions.configure_inventory()
+    db_config.configure(engine=synthetic_db)
+
+def test_stale_fallback_when_database_fails(stale_snapshot):
+    hotels = functions.get_hotels_structured('1', None, None, '2025-01-02', '2025-01-04')
+    assert hotels
+    assert all(hotel['rates_stale'] and hotel['rates_as_of'] for hotel in hotels)
+
+    # Outside the snapshot's window there is nothing to fall back on
+    assert functions.get_hotels_structured('1', None, None, '2025-03-02', '2025-03-04') == []
+
+def test_stale_fallback_in_search_response(stale_snapshot, make_app):
+    response = make_app().test_client().post('/api/search', json=SEARCH)
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert data['results']
+    assert data['stale'] is True and data['ratesAsOf']
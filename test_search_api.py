@@ -0,0 +1,75 @@
+"""Tests for the /api/search endpoint: profiling, validation, shedding and budgets."""
+import os
+
+import profiling
+from conftest import SEARCH
+
+TOKEN = 'profile-secret'
+
+def _fail_if_profiled(*args, **kwargs):
+    raise AssertionError('search was profiled')
+
+def test_profile_with_valid_token(make_app):
+    client = make_app(PROFILE_TOKEN=TOKEN).test_client()
+    response = client.post('/api/search', json=SEARCH, headers={'X-Profile': TOKEN})
+    assert response.status_code == 200
+    assert 'search_hotels' in response.get_json()['profile']
+
+def test_profile_written_to_profile_dir(make_app, tmp_path):
+    client = make_app(PROFILE_TOKEN=TOKEN, PROFILE_DIR=str(tmp_path)).test_client()
+    response = client.post('/api/search', query_string={'profile': TOKEN}, json=SEARCH)
+    assert response.status_code == 200
+    assert 'profile' not in response.get_json()
+    name = response.headers['X-Profile-Id']
+    assert os.path.exists(tmp_path / f'{name}.prof')
+    assert os.path.exists(tmp_path / f'{name}.folded')
+
+def test_wrong_or_non_ascii_token_is_not_profiled(make_app, monkeypatch):
+    monkeypatch.setattr(profiling, 'profile_call', _fail_if_profiled)
+    client = make_app(PROFILE_TOKEN=TOKEN).test_client()
+    for supplied in ('wrong-token', 'é', TOKEN + 'é'):
+        response = client.post('/api/search', query_string={'profile': supplied}, json=SEARCH)
+        assert response.status_code == 200
+        assert 'profile' not in response.get_json()
+
+def test_no_profile_token_configured_disables_profiling(make_app, monkeypatch):
+    monkeypatch.setattr(profiling, 'profile_call', _fail_if_profiled)
+    client = make_app(PROFILE_TOKEN='').test_client()
+    for supplied in ('', 'anything'):
+        response = client.post('/api/search', query_string={'profile': supplied}, json=SEARCH,
+                               headers={'X-Profile': supplied})
+        assert response.status_code == 200
+        assert 'profile' not in response.get_json()
+
+def test_validation_errors_return_400(make_app):
+    client = make_app().test_client()
+    response = client.post('/api/search', json=dict(SEARCH, adults=31))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': True, 'message': 'adults must be between 1 and 30'}
+    response = client.post('/api/search', json=dict(SEARCH, adults=1, rooms=2))
+    assert response.get_json()['message'] == 'Each room needs at least one adult'
+    for body in ([SEARCH], 'search', 42):
+        response = client.post('/api/search', json=body)
+        assert response.status_code == 400
+        assert response.get_json()['message'] == 'Request body must be a JSON object'
+
+def test_dates_are_normalized(make_app):
+    client = make_app().test_client()
+    response = client.post('/api/search', json=dict(SEARCH, checkIn='2025-1-2', checkOut='2025-1-4'))
+    data = response.get_json()['data']
+    assert data['results']
+    assert (data['searchParams']['checkIn'], data['searchParams']['checkOut']) == ('2025-01-02', '2025-01-04')
+
+def test_time_budget_returns_503(make_app):
+    client = make_app(SEARCH_TIME_BUDGET=1e-9).test_client()
+    response = client.post('/api/search', json=SEARCH)
+    assert response.status_code == 503
+    assert response.get_json() == {'error': True, 'message': 'Search took too long, please narrow the search'}
+
+def test_overload_returns_429(make_app):
+    app = make_app(MAX_CONCURRENT_SEARCHES=1, SEARCH_QUEUE_SIZE=0)
+    with app.extensions['search_admission'].slot():
+        response = app.test_client().post('/api/search', json=SEARCH)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['error'] is True
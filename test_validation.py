@@ -0,0 +1,62 @@
+"""Tests for search parameter validation."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from validation import DEFAULT_LIMITS, ValidationError, validate_calendar, validate_search
+
+BASE = {'city_id': '1', 'checkIn': '2025-01-02', 'checkOut': '2025-01-04'}
+
+def _error(**overrides):
+    data = dict(BASE, **overrides)
+    with pytest.raises(ValidationError) as excinfo:
+        validate_search({k: v for k, v in data.items() if v is not None}, DEFAULT_LIMITS)
+    return str(excinfo.value)
+
+def test_valid_search_is_normalized():
+    params = validate_search(dict(BASE, checkIn='2025-1-2', checkOut='2025-01-4', adults='3',
+                                  childrenAges=[4, '', None, '9']), DEFAULT_LIMITS)
+    assert params['check_in'] == '2025-01-02' and params['check_out'] == '2025-01-04'
+    assert params['adults'] == 3 and params['rooms'] == 1 and params['children'] == 0
+    assert params['children_ages'] == [4, 9]
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'city_id': None}, 'Either city or hotel or brand must be provided'),
+    ({'checkIn': ''}, 'Check-in and check-out dates are required'),
+    ({'checkIn': '02/01/2025'}, 'checkIn must be a date in YYYY-MM-DD format'),
+    ({'checkOut': '2025-01-02'}, 'checkOut must be after checkIn'),
+    ({'checkOut': '2025-02-02'}, 'Stays are limited to 30 nights'),
+    ({'adults': 'two'}, 'adults must be a whole number'),
+    ({'adults': 0}, 'adults must be between 1 and 30'),
+    ({'adults': 31}, 'adults must be between 1 and 30'),
+    ({'adults': 20, 'rooms': 11}, 'rooms must be between 1 and 10'),
+    ({'children': 11}, 'children must be between 0 and 10'),
+    ({'childrenAges': [5] * 11}, 'childrenAges must have at most 10 entries'),
+    ({'childrenAges': ['five']}, 'childrenAges must be whole numbers'),
+    ({'childrenAges': [18]}, 'Children ages must be between 0 and 17'),
+    ({'adults': 1, 'rooms': 2}, 'Each room needs at least one adult'),
+])
+def test_limits(overrides, message):
+    assert _error(**overrides) == message
+
+def test_days_ahead_limit():
+    check_in = datetime.now() + timedelta(days=731)
+    message = _error(checkIn=check_in.strftime('%Y-%m-%d'),
+                     checkOut=(check_in + timedelta(days=1)).strftime('%Y-%m-%d'))
+    assert message == 'checkIn must be within 730 days'
+
+def test_limits_can_be_lowered():
+    with pytest.raises(ValidationError, match='adults must be between 1 and 4'):
+        validate_search(dict(BASE, adults=5), dict(DEFAULT_LIMITS, MAX_ADULTS=4))
+
+def test_calendar_window():
+    assert validate_calendar({'hotel_id': '1', 'month': '2025-02'}, DEFAULT_LIMITS) == \
+        {'hotel_id': '1', 'start': '2025-02-01', 'end': '2025-03-01'}
+    assert validate_calendar({'hotel_id': '1', 'start': '2025-1-5'}, DEFAULT_LIMITS)['end'] == '2025-02-05'
+    for data, message in (({'month': '2025-02'}, 'hotel_id is required'),
+                          ({'hotel_id': '1', 'month': 'Feb'}, 'month must be in YYYY-MM format'),
+                          ({'hotel_id': '1', 'start': '2025-01-05', 'end': '2025-01-05'}, 'end must be after start'),
+                          ({'hotel_id': '1', 'start': '2025-01-01', 'end': '2025-04-01'}, 'Calendars are limited to 62 days')):
+        with pytest.raises(ValidationError) as excinfo:
+            validate_calendar(data, DEFAULT_LIMITS)
+        assert str(excinfo.value) == message
@@ -0,0 +1,138 @@
+"""Validation of /api/search parameters against configurable limits."""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping
+
+# Defaults for app.config['SEARCH_LIMITS']; each can be overridden with an
+# environment variable of the same name prefixed with SEARCH_
+DEFAULT_LIMITS = {
+    'MAX_ADULTS': 30,
+    'MAX_ROOMS': 10,
+    'MAX_CHILDREN': 10,
+    'MAX_CHILD_AGE': 17,
+    'MAX_NIGHTS': 30,
+    'MAX_DAYS_AHEAD': 730,
+    'MAX_CALENDAR_DAYS': 62
+}
+
+# Nights shown by /api/calendar when only a start date is given
+DEFAULT_CALENDAR_DAYS = 31
+
+class ValidationError(ValueError):
+    """Raised when search parameters are malformed or exceed the configured limits."""
+
+def limits_from_env() -> Dict[str, int]:
+    """Search limits with SEARCH_<NAME> environment overrides applied."""
+    return {name: int(os.environ.get(f'SEARCH_{name}', default)) for name, default in DEFAULT_LIMITS.items()}
+
+def _int(data: Mapping[str, Any], name: str, default: int, minimum: int, maximum: int) -> int:
+    value = data.get(name, default)
+    if value is None or value == '':
+        value = default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{name} must be a whole number")
+    if not minimum <= value <= maximum:
+        raise ValidationError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+def _date(value: Any, name: str) -> datetime:
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d')
+    except ValueError:
+        raise ValidationError(f"{name} must be a date in YYYY-MM-DD format")
+
+def validate_search(data: Mapping[str, Any], limits: Dict[str, int]) -> Dict[str, Any]:
+    """Check and normalize search parameters, raising ValidationError on bad input."""
+    city_id = data.get('city_id', '')
+    hotel_id = data.get('hotel_id', '')
+    brand_id = data.get('brand_id', '')
+
+    # Either city or hotel or brand must be provided
+    if not city_id and not hotel_id and not brand_id:
+        raise ValidationError('Either city or hotel or brand must be provided')
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    check_in = data.get('checkIn', today)
+    check_out = data.get('checkOut', today)
+    if not check_in or not check_out:
+        raise ValidationError('Check-in and check-out dates are required')
+    check_in_date = _date(check_in, 'checkIn')
+    check_out_date = _date(check_out, 'checkOut')
+    nights = (check_out_date - check_in_date).days
+    if nights < 1:
+        raise ValidationError('checkOut must be after checkIn')
+    if nights > limits['MAX_NIGHTS']:
+        raise ValidationError(f"Stays are limited to {limits['MAX_NIGHTS']} nights")
+    if check_in_date > datetime.now() + timedelta(days=limits['MAX_DAYS_AHEAD']):
+        raise ValidationError(f"checkIn must be within {limits['MAX_DAYS_AHEAD']} days")
+
+    adults = _int(data, 'adults', 1, 1, limits['MAX_ADULTS'])
+    rooms = _int(data, 'rooms', 1, 1, limits['MAX_ROOMS'])
+    children = _int(data, 'children', 0, 0, limits['MAX_CHILDREN'])
+
+    children_ages: List[int] = []
+    raw_ages = data.get('childrenAges')
+    if isinstance(raw_ages, list):
+        if len(raw_ages) > limits['MAX_CHILDREN']:
+            raise ValidationError(f"childrenAges must have at most {limits['MAX_CHILDREN']} entries")
+        for age in raw_ages:
+            if age is None or age == '':
+                continue
+            try:
+                age = int(age)
+            except (TypeError, ValueError):
+                raise ValidationError('childrenAges must be whole numbers')
+            if not 0 <= age <= limits['MAX_CHILD_AGE']:
+                raise ValidationError(f"Children ages must be between 0 and {limits['MAX_CHILD_AGE']}")
+            children_ages.append(age)
+
+    if rooms > adults:
+        raise ValidationError('Each room needs at least one adult')
+
+    return {
+        'city_id': city_id,
+        'hotel_id': hotel_id,
+        'brand_id': brand_id,
+        # Normalized so lookups and cache keys see one spelling of each date
+        'check_in': check_in_date.strftime('%Y-%m-%d'),
+        'check_out': check_out_date.strftime('%Y-%m-%d'),
+        'adults': adults,
+        'rooms': rooms,
+        'children': children,
+        'children_ages': children_ages
+    }
+
+def validate_calendar(data: Mapping[str, Any], limits: Dict[str, int]) -> Dict[str, Any]:
+    """Check calendar parameters: a hotel and either a month or a start and end date."""
+    hotel_id = data.get('hotel_id', '')
+    if not hotel_id:
+        raise ValidationError('hotel_id is required')
+
+    month = data.get('month')
+    if month:
+        try:
+            start_date = datetime.strptime(str(month), '%Y-%m')
+        except ValueError:
+            raise ValidationError('month must be in YYYY-MM format')
+        end_date = (start_date + timedelta(days=31)).replace(day=1)
+    else:
+        start = data.get('start')
+        start_date = _date(start, 'start') if start else datetime.strptime(datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        end = data.get('end')
+        end_date = _date(end, 'end') if end else start_date + timedelta(days=DEFAULT_CALENDAR_DAYS)
+
+    days = (end_date - start_date).days
+    if days < 1:
+        raise ValidationError('end must be after start')
+    if days > limits['MAX_CALENDAR_DAYS']:
+        raise ValidationError(f"Calendars are limited to {limits['MAX_CALENDAR_DAYS']} days")
+    if start_date > datetime.now() + timedelta(days=limits['MAX_DAYS_AHEAD']):
+        raise ValidationError(f"start must be within {limits['MAX_DAYS_AHEAD']} days")
+
+    return {
+        'hotel_id': hotel_id,
+        'start': start_date.strftime('%Y-%m-%d'),
+        'end': end_date.strftime('%Y-%m-%d')
+    }